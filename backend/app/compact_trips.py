@@ -0,0 +1,87 @@
+# app/compact_trips.py
+"""
+Move existing trips from one-row-per-point `segments` into the compact
+columns on `trips`, then delete the old rows.
+
+    python -m app.compact_trips [--batch 200] [--limit N] [--dry-run]
+"""
+import argparse
+
+from sqlalchemy import delete, select
+
+from .database import SessionLocal, engine
+from .db_models import Trip, Segment
+from .migrations import upgrade_schema
+from .trip_codec import encode_segments
+
+
+def compact_batch(db, batch: int, after_id: int) -> tuple:
+    """Compact up to `batch` row-stored trips with id > after_id."""
+    trips = db.execute(
+        select(Trip)
+        .where(Trip.seg_count.is_(None), Trip.id > after_id)
+        .order_by(Trip.id)
+        .limit(batch)
+    ).scalars().all()
+
+    if not trips:
+        return 0, 0, after_id
+
+    ids = [t.id for t in trips]
+    rows = db.execute(
+        select(Segment)
+        .where(Segment.trip_id.in_(ids))
+        .order_by(Segment.trip_id, Segment.idx)
+    ).scalars().all()
+
+    by_trip = {}
+    for seg in rows:
+        by_trip.setdefault(seg.trip_id, []).append(seg)
+
+    for t in trips:
+        for key, value in encode_segments(by_trip.get(t.id, [])).items():
+            setattr(t, key, value)
+
+    db.execute(delete(Segment).where(Segment.trip_id.in_(ids)))
+    return len(trips), len(rows), ids[-1]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compact trip segments into packed columns.")
+    ap.add_argument("--batch", type=int, default=200, help="trips per transaction")
+    ap.add_argument("--limit", type=int, default=0, help="stop after N trips (0 = all)")
+    ap.add_argument("--dry-run", action="store_true", help="roll back instead of committing")
+    args = ap.parse_args()
+
+    added = upgrade_schema(engine)
+    if added:
+        print("added columns:", ", ".join(added))
+
+    total_trips = total_rows = 0
+    last_id = 0
+
+    while not args.limit or total_trips < args.limit:
+        batch = args.batch if not args.limit else min(args.batch, args.limit - total_trips)
+        db = SessionLocal()
+        try:
+            n_trips, n_rows, last_id = compact_batch(db, batch, last_id)
+            if args.dry_run:
+                db.rollback()
+            else:
+                db.commit()
+        finally:
+            db.close()
+
+        if not n_trips:
+            break
+
+        total_trips += n_trips
+        total_rows += n_rows
+        print(f"compacted {total_trips} trips ({total_rows} segment rows) ...")
+
+    verb = "would compact" if args.dry_run else "compacted"
+    print(f"done: {verb} {total_trips} trips, {total_rows} segment rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
-from contextlib import contextmanager
 
 # Load .env file
 load_dotenv()
@@ -13,10 +14,41 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set in .env")
 
-# Create engine
+
+def _async_url(url: str) -> str:
+    """Swap the sync driver for its asyncio counterpart (psycopg2 → asyncpg)."""
+    u = make_url(url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    backend = u.get_backend_name()
+    if backend not in drivers:
+        raise RuntimeError(f"No async driver configured for '{backend}' databases")
+    return u.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# Pool settings (per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+_IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+_pool_args = {} if _IS_SQLITE else dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+)
+
+# Sync engine: schema upgrades and command-line tools
 engine = create_engine(DATABASE_URL, future=True)
 
-# Session factory
+# Async engine: every request-path query
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args)
+
+# Session factories
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -24,24 +56,33 @@ SessionLocal = sessionmaker(
     future=True
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 print("🔥 USING DATABASE:", DATABASE_URL)
 
 
 # -----------------------------------------------------
-# ⭐ FIX: Always force timezone UTC at session startup
+# ⭐ Force timezone UTC once per pooled connection
 # -----------------------------------------------------
-@contextmanager
-def get_db():
-    db = SessionLocal()
-    try:
-        # Force this session to use UTC timezone
-        db.execute(text("SET TIMEZONE = 'UTC';"))
+def _force_utc(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET TIME ZONE 'UTC'")
+    cursor.close()
+
+
+if not _IS_SQLITE:
+    event.listen(engine, "connect", _force_utc)
+    event.listen(async_engine.sync_engine, "connect", _force_utc)
+
+
+async def get_db():
+    """FastAPI dependency: one AsyncSession per request."""
+    async with AsyncSessionLocal() as db:
         yield db
-        db.commit()
-    except Exception:
-        db.rollback()
-        raise
-    finally:
-        db.close()
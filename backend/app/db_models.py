@@ -1,5 +1,5 @@
 # app/db_models.py
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Boolean, Integer, BigInteger, Float, String, DateTime, ForeignKey, Text, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .database import Base
@@ -25,6 +25,13 @@ class SearchedPoint(Base):
     temp_c = Column(Float, nullable=False)
     reason = Column(String, nullable=False)
 
+    # Weather not from a current forecast (see HoriSegment); NULL on older rows
+    degraded = Column(Boolean, nullable=True)
+    stale_age_s = Column(Integer, nullable=True)
+
+    # Keyset pagination key, newest first (see app/pagination.py)
+    __table_args__ = (Index("ix_searched_points_created_at_id", "created_at", "id"),)
+
 
 class Trip(Base):
     __tablename__ = "trips"
@@ -54,7 +61,26 @@ class Trip(Base):
     dst_name = Column(String, nullable=True)
     stop_names = Column(Text, default="[]")  # JSON list as text
 
-    segments = relationship("Segment", back_populates="trip", cascade="all, delete-orphan")
+    # Scored from stale or fallback weather (see HoriSummary); NULL on older rows
+    degraded = Column(Boolean, nullable=True)
+    stale_age_s = Column(Integer, nullable=True)
+
+    # Compact segment storage (TRIP_STORAGE=compact), see app/trip_codec.py.
+    # seg_count is NULL for trips whose segments live in the segments table.
+    geometry = Column(Text, nullable=True)            # polyline6
+    seg_count = Column(Integer, nullable=True)
+    seg_t0 = Column(BigInteger, nullable=True)        # epoch seconds of segment 0
+    seg_ts_offsets = Column(LargeBinary, nullable=True)  # int32 seconds from seg_t0
+    seg_temp = Column(LargeBinary, nullable=True)     # float32
+    seg_aqi = Column(LargeBinary, nullable=True)      # int16
+    seg_hori = Column(LargeBinary, nullable=True)     # uint8
+    seg_reason = Column(LargeBinary, nullable=True)   # uint8 codes, app.scoring.REASONS
+    seg_degraded = Column(LargeBinary, nullable=True)  # uint8 0/1
+    seg_stale_age = Column(LargeBinary, nullable=True)  # int32 seconds, -1 = not stale
+
+    segments = relationship("Segment", back_populates="trip", cascade="all, delete-orphan", order_by="Segment.idx")
+
+    __table_args__ = (Index("ix_trips_created_at_id", "created_at", "id"),)
 
 
 class Segment(Base):
@@ -74,4 +100,27 @@ class Segment(Base):
     hori = Column(Integer, nullable=False)
     reason = Column(String, nullable=False)
 
+    degraded = Column(Boolean, nullable=True)
+    stale_age_s = Column(Integer, nullable=True)
+
     trip = relationship("Trip", back_populates="segments")
+
+    # Trip detail loads all segments of one trip, in order
+    __table_args__ = (Index("ix_segments_trip_id_idx", "trip_id", "idx"),)
+
+
+class ForecastCell(Base):
+    __tablename__ = "forecast_cells"
+
+    # One hourly series per (kind, grid cell), shared by every replica.
+    # Written by the prefetcher (app/prefetch.py), read on cache misses.
+    kind = Column(String, primary_key=True)
+    cell_lat = Column(Float, primary_key=True)
+    cell_lon = Column(Float, primary_key=True)
+
+    origin_hour = Column(BigInteger, nullable=False)  # epoch hours of values[0]
+    hourly = Column(LargeBinary, nullable=False)      # float32, NaN = missing
+    fetched_at = Column(BigInteger, nullable=False)   # epoch seconds
+    expires_at = Column(BigInteger, nullable=False)   # epoch seconds
+
+    __table_args__ = (Index("ix_forecast_cells_kind_fetched_at", "kind", "fetched_at"),)
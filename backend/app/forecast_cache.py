@@ -0,0 +1,45 @@
+# app/forecast_cache.py
+import math
+import os
+import time
+from typing import Tuple
+
+from .utils.ttl_cache import TTLCache
+
+
+# Grid resolution in degrees (0.05° ≈ 5.5 km, finer than Open-Meteo's own models)
+FORECAST_GRID_DEG = float(os.getenv("FORECAST_GRID_DEG", "0.05"))
+
+# Open-Meteo refreshes its hourly series once per model run; we align
+# expiry to the next cadence boundary (plus a small lag for the upstream
+# to publish) so every cell in a burst expires together.
+FORECAST_CADENCE_S = int(os.getenv("FORECAST_CADENCE_S", "3600"))
+FORECAST_PUBLISH_LAG_S = int(os.getenv("FORECAST_PUBLISH_LAG_S", "300"))
+
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "5000"))
+
+# Expired series stay available this long as the last-known fallback
+# when Open-Meteo is slow or failing (served flagged as stale)
+FORECAST_STALE_MAX_S = int(os.getenv("FORECAST_STALE_MAX_S", str(6 * 3600)))
+
+
+def snap_to_cell(lat: float, lon: float, res: float = FORECAST_GRID_DEG) -> Tuple[float, float]:
+    """Snap a coordinate to the centre of its grid cell."""
+    lat_c = (math.floor(lat / res) + 0.5) * res
+    lon_c = (math.floor(lon / res) + 0.5) * res
+    return round(lat_c, 6), round(lon_c, 6)
+
+
+def next_refresh(now: float = None) -> float:
+    """Epoch seconds at which data fetched `now` should be considered stale."""
+    now = time.time() if now is None else now
+    expires = (now // FORECAST_CADENCE_S) * FORECAST_CADENCE_S + FORECAST_PUBLISH_LAG_S
+
+    # Past this run's publish point: keep it until the next run lands
+    if expires <= now:
+        expires += FORECAST_CADENCE_S
+    return expires
+
+
+# Keyed on (kind, cell_lat, cell_lon); values are full hourly series
+forecast_cache = TTLCache(max_entries=FORECAST_CACHE_MAX_ENTRIES, stale_ttl=FORECAST_STALE_MAX_S)
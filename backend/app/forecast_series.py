@@ -0,0 +1,140 @@
+# app/forecast_series.py
+import datetime as dt
+from array import array
+from typing import Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+_HOUR_S = 3600
+_NAN = float("nan")
+
+
+def _parse_epoch_hour(ts: str) -> int:
+    d = dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=dt.timezone.utc)
+    return int(d.timestamp()) // _HOUR_S
+
+
+class ForecastSeries:
+    """
+    Hourly forecast parsed once into an epoch-hour origin plus a contiguous
+    float array (NaN marks missing hours). Lookups are direct index math.
+    """
+
+    __slots__ = ("origin_hour", "values")
+
+    def __init__(self, origin_hour: int, values: array):
+        self.origin_hour = origin_hour
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f"ForecastSeries(origin_hour={self.origin_hour}, n={len(self.values)})"
+
+    @classmethod
+    def from_hourly(cls, times: Sequence[str], values: Sequence[Optional[float]]) -> "ForecastSeries":
+        """Build from Open-Meteo's parallel `time` / value lists."""
+        n = min(len(times), len(values))
+        if n == 0:
+            return cls(0, array("d"))
+
+        try:
+            first = _parse_epoch_hour(times[0])
+            last = _parse_epoch_hour(times[n - 1])
+        except (TypeError, ValueError):
+            first = last = None
+
+        # Open-Meteo hourly data is contiguous; only parse every stamp if not
+        if first is not None and last - first == n - 1:
+            vals = array("d", (_NAN if v is None else float(v) for v in values[:n]))
+            return cls(first, vals)
+
+        # Out of order or gappy: size the grid from the stamps actually present
+        hourly = []
+        for t, v in zip(times[:n], values[:n]):
+            if v is None:
+                continue
+            try:
+                hourly.append((_parse_epoch_hour(t), float(v)))
+            except (TypeError, ValueError):
+                continue
+        if not hourly:
+            return cls(0, array("d"))
+
+        first = min(h for h, _ in hourly)
+        last = max(h for h, _ in hourly)
+        vals = array("d", [_NAN]) * (last - first + 1)
+        for h, v in hourly:
+            vals[h - first] = v
+        return cls(first, vals)
+
+    @property
+    def start_epoch(self) -> int:
+        return self.origin_hour * _HOUR_S
+
+    def value_at(self, epoch_s: float, interpolate: bool = True) -> Optional[float]:
+        """Value at a unix timestamp; clamps to the series ends like a closest-hour pick."""
+        vals = self.values
+        n = len(vals)
+        if n == 0:
+            return None
+
+        pos = epoch_s / _HOUR_S - self.origin_hour
+        if pos <= 0:
+            i = 0
+        elif pos >= n - 1:
+            i = n - 1
+        elif interpolate:
+            lo = int(pos)
+            w = pos - lo
+            a, b = vals[lo], vals[lo + 1]
+            if a == a and b == b:  # neither is NaN
+                return a + (b - a) * w
+
+            # One neighbour missing: use the other, nearest first
+            for v in ((a, b) if w < 0.5 else (b, a)):
+                if v == v:
+                    return v
+            return None
+        else:
+            i = int(pos + 0.5)
+
+        v = vals[i]
+        return None if v != v else v
+
+    def values_at(
+        self,
+        epochs: Iterable[float],
+        interpolate: bool = True,
+        default: Optional[float] = None,
+    ) -> List[Optional[float]]:
+        """Vector form of value_at; missing values become `default`."""
+        if np is None or not self.values:
+            out = []
+            for t in epochs:
+                v = self.value_at(t, interpolate)
+                out.append(default if v is None else v)
+            return out
+
+        vals = np.frombuffer(self.values, dtype=np.float64)
+        n = len(vals)
+        pos = np.fromiter(epochs, dtype=np.float64) / _HOUR_S - self.origin_hour
+
+        if interpolate and n > 1:
+            lo = np.clip(np.floor(pos), 0, n - 2).astype(np.intp)
+            a, b = vals[lo], vals[lo + 1]
+            out = a + (b - a) * (pos - lo)
+            # One neighbour missing: use the other
+            out = np.where(np.isnan(a), b, np.where(np.isnan(b), a, out))
+        else:
+            out = vals[np.clip(np.floor(pos + 0.5), 0, n - 1).astype(np.intp)]
+
+        # Outside the series: the end value itself, as value_at clamps
+        out = np.where(pos <= 0, vals[0], np.where(pos >= n - 1, vals[-1], out))
+        return [default if v != v else v for v in out.tolist()]
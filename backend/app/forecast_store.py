@@ -0,0 +1,172 @@
+# app/forecast_store.py
+import logging
+import os
+import time
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal
+from .db_models import ForecastCell
+from .forecast_series import ForecastSeries
+from .trip_codec import _pack, _unpack
+
+log = logging.getLogger(__name__)
+
+# Read the shared forecast_cells table on in-process cache misses, before
+# going to Open-Meteo. Only the prefetcher fills that table, so this
+# defaults to on just where it runs in-process (FORECAST_PREFETCH); set
+# FORECAST_STORE=true on replicas served by a separate `app.prefetch`.
+FORECAST_STORE = os.getenv(
+    "FORECAST_STORE", os.getenv("FORECAST_PREFETCH", "false")
+).strip().lower() in ("1", "true", "yes", "on")
+
+# Cells per SELECT ... WHERE (cell_lat, cell_lon) IN (...)
+FORECAST_STORE_READ_CHUNK = int(os.getenv("FORECAST_STORE_READ_CHUNK", "500"))
+
+Cell = Tuple[float, float]
+
+_counters = {"hits": 0, "misses": 0, "stale": 0, "errors": 0, "written": 0}
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _series_row(kind: str, cell: Cell, series: ForecastSeries, fetched_at: float, expires_at: float) -> dict:
+    return {
+        "kind": kind,
+        "cell_lat": cell[0],
+        "cell_lon": cell[1],
+        "origin_hour": series.origin_hour,
+        "hourly": _pack("f", series.values),
+        "fetched_at": int(fetched_at),
+        "expires_at": int(expires_at),
+    }
+
+
+def _row_series(origin_hour: int, hourly: bytes) -> ForecastSeries:
+    # Widen back to float64, the typecode ForecastSeries parses into
+    return ForecastSeries(origin_hour, array("d", _unpack("f", hourly)))
+
+
+async def load_series(kind: str, cells: List[Cell], max_stale_s: float = 0) -> Dict[Cell, Tuple[ForecastSeries, float]]:
+    """
+    Stored series for `cells`, as {cell: (series, expires_at)}, including
+    ones expired less than `max_stale_s` ago. A store that is unreachable
+    or empty just returns fewer cells.
+    """
+    if not FORECAST_STORE or not cells:
+        return {}
+
+    now = int(time.time())
+    oldest = int(now - max_stale_s)
+    out = {}
+    try:
+        async with AsyncSessionLocal() as db:
+            for chunk in _chunks(cells, FORECAST_STORE_READ_CHUNK):
+                rows = await db.execute(
+                    select(
+                        ForecastCell.cell_lat,
+                        ForecastCell.cell_lon,
+                        ForecastCell.origin_hour,
+                        ForecastCell.hourly,
+                        ForecastCell.expires_at,
+                    ).where(
+                        ForecastCell.kind == kind,
+                        ForecastCell.expires_at > oldest,
+                        tuple_(ForecastCell.cell_lat, ForecastCell.cell_lon).in_(chunk),
+                    )
+                )
+                for lat, lon, origin_hour, hourly, expires_at in rows:
+                    out[(lat, lon)] = (_row_series(origin_hour, hourly), float(expires_at))
+    except Exception:
+        _counters["errors"] += 1
+        log.exception("forecast store read failed")
+        return {}
+
+    fresh = sum(1 for _, expires_at in out.values() if expires_at > now)
+    _counters["hits"] += fresh
+    _counters["stale"] += len(out) - fresh
+    _counters["misses"] += len(cells) - fresh
+    return out
+
+
+async def save_series(
+    db: AsyncSession,
+    kind: str,
+    series_by_cell: Dict[Cell, ForecastSeries],
+    fetched_at: float,
+    expires_at: float,
+) -> int:
+    """Upsert one kind's series in a single executemany; caller commits."""
+    rows = [_series_row(kind, cell, s, fetched_at, expires_at) for cell, s in series_by_cell.items()]
+    if not rows:
+        return 0
+
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(ForecastCell)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ForecastCell.kind, ForecastCell.cell_lat, ForecastCell.cell_lon],
+        set_={col: stmt.excluded[col] for col in ("origin_hour", "hourly", "fetched_at", "expires_at")},
+    )
+    await db.execute(stmt, rows)
+
+    _counters["written"] += len(rows)
+    return len(rows)
+
+
+async def stale_cells(db: AsyncSession, kind: str, cells: List[Cell], margin_s: float = 0) -> List[Cell]:
+    """Those of `cells` with no stored series, or one expiring within `margin_s`."""
+    cutoff = int(time.time() + margin_s)
+    fresh = set()
+    for chunk in _chunks(cells, FORECAST_STORE_READ_CHUNK):
+        rows = await db.execute(
+            select(ForecastCell.cell_lat, ForecastCell.cell_lon).where(
+                ForecastCell.kind == kind,
+                ForecastCell.expires_at > cutoff,
+                tuple_(ForecastCell.cell_lat, ForecastCell.cell_lon).in_(chunk),
+            )
+        )
+        fresh.update(rows.tuples())
+    return [c for c in cells if c not in fresh]
+
+
+async def freshness(db: AsyncSession) -> dict:
+    """Per kind: cells stored, how many are still current, and their age range."""
+    now = int(time.time())
+    rows = await db.execute(
+        select(
+            ForecastCell.kind,
+            func.count(),
+            func.sum(case((ForecastCell.expires_at > now, 1), else_=0)),
+            func.min(ForecastCell.fetched_at),
+            func.max(ForecastCell.fetched_at),
+            func.min(ForecastCell.expires_at),
+        ).group_by(ForecastCell.kind)
+    )
+
+    kinds = {}
+    for kind, total, fresh, oldest, newest, next_expiry in rows:
+        kinds[kind] = {
+            "cells": total,
+            "fresh": int(fresh or 0),
+            "stale": total - int(fresh or 0),
+            "oldest_age_s": now - oldest,
+            "newest_age_s": now - newest,
+            "next_expiry_in_s": next_expiry - now,
+        }
+    return kinds
+
+
+def stats() -> dict:
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        "enabled": FORECAST_STORE,
+        **_counters,
+        "hit_rate": round(_counters["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,145 @@
+# app/geocoding.py
+import logging
+import os
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_models import SearchedPoint, Trip
+from .http_clients import get_client
+from .metrics import track_upstream
+from .utils.singleflight import SingleFlight
+from .utils.ttl_cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "5000"))
+GEOCODE_CACHE_TTL_S = float(os.getenv("GEOCODE_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+# A query is answered from the prefix index alone when it has at least this
+# many local matches; below that it goes to Nominatim
+GEOCODE_LOCAL_MIN_RESULTS = int(os.getenv("GEOCODE_LOCAL_MIN_RESULTS", "3"))
+GEOCODE_INDEX_MAX_NAMES = int(os.getenv("GEOCODE_INDEX_MAX_NAMES", "50000"))
+GEOCODE_SEED_LIMIT = int(os.getenv("GEOCODE_SEED_LIMIT", "20000"))
+
+# (place_name, lat, lon)
+Place = Tuple[str, float, float]
+
+
+class GeocodeError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"Nominatim returned {status_code}")
+        self.status_code = status_code
+
+
+def normalize(q: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys and the index."""
+    return " ".join(q.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Known place names kept sorted by normalized form; a prefix query is a
+    bisect to the first candidate plus a short forward scan.
+    """
+
+    def __init__(self, max_names: int):
+        self.max_names = max_names
+        self._keys: List[str] = []
+        self._places: Dict[str, Place] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, name: Optional[str], lat: float, lon: float) -> None:
+        if not name or lat is None or lon is None:
+            return
+        key = normalize(name)
+        if key in self._places or len(self._keys) >= self.max_names:
+            return
+        self._places[key] = (name, float(lat), float(lon))
+        insort(self._keys, key)
+
+    def lookup(self, prefix: str, limit: int) -> List[Place]:
+        out = []
+        i = bisect_left(self._keys, prefix)
+        keys = self._keys
+        while i < len(keys) and len(out) < limit and keys[i].startswith(prefix):
+            out.append(self._places[keys[i]])
+            i += 1
+        return out
+
+
+# (normalized query, limit) -> tuple of Places, as Nominatim answered
+geocode_cache = TTLCache(max_entries=GEOCODE_CACHE_MAX_ENTRIES, default_ttl=GEOCODE_CACHE_TTL_S)
+geocode_flight = SingleFlight()
+place_index = PrefixIndex(GEOCODE_INDEX_MAX_NAMES)
+
+_counters = {"local": 0, "upstream": 0}
+
+
+async def geocode(q: str, limit: int) -> List[Place]:
+    """
+    Places matching `q`: exact repeat queries come from the result cache,
+    well-covered prefixes from the local index, and only the rest from
+    Nominatim (concurrent identical misses share one request).
+    """
+    norm = normalize(q)
+    key = (norm, limit)
+
+    cached = geocode_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    local = place_index.lookup(norm, limit)
+    if len(local) >= min(limit, GEOCODE_LOCAL_MIN_RESULTS):
+        _counters["local"] += 1
+        return local
+
+    return list(await geocode_flight.do(key, lambda: _fetch(norm, limit)))
+
+
+async def _fetch(norm: str, limit: int) -> Tuple[Place, ...]:
+    params = {"format": "json", "addressdetails": 1, "q": norm, "limit": limit}
+
+    async with track_upstream("nominatim"):
+        r = await get_client("nominatim").get("/search", params=params)
+        if r.status_code != 200:
+            raise GeocodeError(r.status_code)
+
+    _counters["upstream"] += 1
+    places = tuple(
+        (item.get("display_name"), float(item.get("lat")), float(item.get("lon")))
+        for item in r.json()
+    )
+
+    geocode_cache.set((norm, limit), places)
+    for name, lat, lon in places:
+        place_index.add(name, lat, lon)
+    return places
+
+
+async def seed_index(db: AsyncSession) -> int:
+    """Load place names we have already resolved (points and trips) into the index."""
+    query = union(
+        select(SearchedPoint.place_name, SearchedPoint.lat, SearchedPoint.lon),
+        select(Trip.src_name, Trip.src_lat, Trip.src_lon),
+        select(Trip.dst_name, Trip.dst_lat, Trip.dst_lon),
+    ).limit(GEOCODE_SEED_LIMIT)
+
+    before = len(place_index)
+    for name, lat, lon in (await db.execute(query)).all():
+        place_index.add(name, lat, lon)
+    return len(place_index) - before
+
+
+def stats() -> dict:
+    return {
+        **geocode_cache.stats(),
+        **geocode_flight.stats(),
+        "index_names": len(place_index),
+        "local_answers": _counters["local"],
+        "upstream_calls": _counters["upstream"],
+    }
@@ -1,9 +1,24 @@
 # app/hori.py
+import asyncio
 import datetime as dt
+import logging
+import math
 import os
-from typing import List, Tuple, Optional
-import httpx
-from .models import SegmentPoint, HoriSegment, HoriSummary
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .forecast_cache import FORECAST_STALE_MAX_S, forecast_cache, next_refresh, snap_to_cell
+from .forecast_series import ForecastSeries
+from .forecast_store import load_series
+from .http_clients import get_client
+from .metrics import UPSTREAM_HEDGES, WEATHER_DEGRADED, set_circuit_state, track_upstream
+from .models import SegmentPoint, HoriSummary
+from .scoring import score_batch, score_point, score_sweep, segment_weights
+from .trip_codec import SegmentColumns
+from .utils.resilience import CircuitBreaker, CircuitOpenError, hedged
+
+log = logging.getLogger(__name__)
 
 
 # ---- UTC helpers ----
@@ -20,6 +35,9 @@ def _iso(ts: dt.datetime) -> str:
 
 def parse_iso(ts: str) -> dt.datetime:
     """Always return timezone-aware UTC datetime."""
+    if isinstance(ts, dt.datetime):
+        return ensure_aware(ts)
+
     try:
         d = dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
     except:
@@ -29,128 +47,611 @@ def parse_iso(ts: str) -> dt.datetime:
 
 
 # ---- Forecast Helpers ----
-def _closest_hour_idx(times: list[str], target: dt.datetime) -> Optional[int]:
-    target = ensure_aware(target)
-    parsed = []
+# (kind) -> (upstream client, path, hourly variable)
+_FORECAST_SOURCES = {
+    "temperature": ("open_meteo", "/v1/forecast", "temperature_2m"),
+    "aqi": ("air_quality", "/v1/air-quality", "us_aqi"),
+}
+
+# Used when no forecast at all is available for a point; such points are
+# flagged `degraded` in the response instead of passing for real data
+FALLBACK_TEMP_C = 20.0
+FALLBACK_AQI = 60
+
+
+# Coordinates per multi-location request, and hard cap on upstream calls
+# (both kinds together) that one route enrichment may issue.
+CORRIDOR_BATCH_SIZE = int(os.getenv("CORRIDOR_BATCH_SIZE", "50"))
+CORRIDOR_MAX_CALLS = int(os.getenv("CORRIDOR_MAX_CALLS", "8"))
+
+# Forecast requests in flight at once across the process, so large
+# batches queue here instead of exhausting the connection pool
+FORECAST_FETCH_CONCURRENCY = int(os.getenv("FORECAST_FETCH_CONCURRENCY", "8"))
+_fetch_slots = asyncio.Semaphore(FORECAST_FETCH_CONCURRENCY)
+
+# How long one request waits for weather. Cells still being fetched after
+# that are answered from their last-known series (flagged stale) and the
+# fetch finishes in the background to refresh the cache.
+WEATHER_BUDGET_S = float(os.getenv("WEATHER_BUDGET_S", "2.5"))
+
+# Bulk lookups (score_points: /hori/points, tiles) get one WEATHER_BUDGET_S
+# per wave of fetches their cells need, up to this much in total
+WEATHER_BULK_BUDGET_S = float(os.getenv("WEATHER_BULK_BUDGET_S", "30"))
+
+# A forecast request unanswered after this long is sent a second time
+WEATHER_HEDGE_AFTER_S = float(os.getenv("WEATHER_HEDGE_AFTER_S", "1.0"))
+
+# Consecutive failures that open an upstream's circuit, and how long it
+# fails fast before letting one probe request through
+WEATHER_BREAKER_FAILURES = int(os.getenv("WEATHER_BREAKER_FAILURES", "5"))
+WEATHER_BREAKER_RESET_S = float(os.getenv("WEATHER_BREAKER_RESET_S", "30"))
+
+_breakers = {
+    client_name: CircuitBreaker(
+        client_name, WEATHER_BREAKER_FAILURES, WEATHER_BREAKER_RESET_S, on_change=set_circuit_state
+    )
+    for client_name, _, _ in _FORECAST_SOURCES.values()
+}
 
-    for t in times:
-        try:
-            d = dt.datetime.fromisoformat(t.replace("Z", "+00:00"))
-            parsed.append(ensure_aware(d))
-        except:
-            continue
+# Monotonic deadline shared by all weather lookups of the current request
+_deadline: ContextVar[Optional[float]] = ContextVar("weather_deadline", default=None)
 
-    if not parsed:
-        return None
+# "corridor" = per-segment weather, "midpoint" = legacy single lookup
+HORI_ENRICH_MODE = os.getenv("HORI_ENRICH_MODE", "corridor")
 
-    return min(range(len(parsed)), key=lambda i: abs(parsed[i] - target))
 
+class CellForecast(NamedTuple):
+    """A cell's series (None = nothing usable) and, if expired, how long ago."""
+    series: Optional[ForecastSeries]
+    stale_age_s: Optional[int] = None
 
-async def _fetch_temp_once(lat: float, lon: float, at: dt.datetime) -> float:
-    at = ensure_aware(at)
 
-    url = (
-        "https://api.open-meteo.com/v1/forecast"
-        f"?latitude={lat}&longitude={lon}&hourly=temperature_2m&timezone=UTC"
-    )
+@contextmanager
+def weather_budget(seconds: float = WEATHER_BUDGET_S):
+    """Give every weather lookup inside the block one shared deadline (outermost wins)."""
+    if _deadline.get() is not None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def _get_forecast(client_name: str, path: str, params: dict):
+    async with _fetch_slots:
+        async with track_upstream(client_name):
+            r = await get_client(client_name).get(path, params=params)
+            r.raise_for_status()
+    return r
+
+
+async def _request_hourly(kind: str, cells: List[Tuple[float, float]]) -> List[ForecastSeries]:
+    """
+    One upstream call for many cells (Open-Meteo takes comma-separated lists).
+    Plain, for callers that pace themselves (the prefetcher); request-path
+    lookups go through _request_hourly_guarded.
+    """
+    client_name, path, variable = _FORECAST_SOURCES[kind]
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in cells),
+        "longitude": ",".join(str(lon) for _, lon in cells),
+        "hourly": variable,
+        "timezone": "UTC",
+    }
+
+    data = (await _get_forecast(client_name, path, params)).json()
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        h = r.json().get("hourly", {})
+    # A single location comes back as an object, several as a list
+    if isinstance(data, dict):
+        data = [data]
 
-    times = h.get("time", [])
-    temps = h.get("temperature_2m", [])
+    if len(data) != len(cells):
+        raise ValueError(f"Open-Meteo returned {len(data)} locations for {len(cells)} requested")
 
-    idx = _closest_hour_idx(times, at)
-    if idx is not None and idx < len(temps):
-        return float(temps[idx])
+    out = []
+    for item in data:
+        h = item.get("hourly", {})
+        out.append(ForecastSeries.from_hourly(h.get("time", []), h.get(variable, [])))
+    return out
 
-    return 20.0
 
+async def _request_hourly_guarded(kind: str, cells: List[Tuple[float, float]]) -> List[ForecastSeries]:
+    """_request_hourly hedged when slow, and refused outright while the upstream's circuit is open."""
+    client_name = _FORECAST_SOURCES[kind][0]
+    async with _breakers[client_name].guard():
+        return await hedged(
+            lambda: _request_hourly(kind, cells),
+            WEATHER_HEDGE_AFTER_S,
+            on_hedge=UPSTREAM_HEDGES.labels(client_name).inc,
+        )
 
-async def _fetch_aqi_once(lat: float, lon: float, at: dt.datetime) -> int:
-    at = ensure_aware(at)
 
-    url = (
-        "https://air-quality-api.open-meteo.com/v1/air-quality"
-        f"?latitude={lat}&longitude={lon}&hourly=us_aqi,pm2_5&timezone=UTC"
-    )
+# (kind, cell_lat, cell_lon) -> Future of the series currently being fetched,
+# so overlapping concurrent enrichments share one upstream request per cell
+_inflight = {}
+
+# Fetches that outlived the request that started them
+_revalidations = set()
+
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        h = r.json().get("hourly", {})
+def _abandon(kind: str, futures: dict) -> None:
+    """Cancel unresolved futures so no later caller waits on them."""
+    for cell, fut in futures.items():
+        if _inflight.get((kind, *cell)) is fut:
+            del _inflight[(kind, *cell)]
+        if not fut.done():
+            fut.cancel()
 
-    times = h.get("time", [])
-    aqis = h.get("us_aqi", [])
 
-    idx = _closest_hour_idx(times, at)
-    if idx is not None and idx < len(aqis) and aqis[idx] is not None:
-        return int(aqis[idx])
+async def _revalidate(kind: str, cells: List[Tuple[float, float]], futures: dict) -> None:
+    """Fetch `cells` upstream, cache them and resolve their futures; runs detached from any request."""
+    chunks = [
+        cells[i:i + CORRIDOR_BATCH_SIZE]
+        for i in range(0, len(cells), CORRIDOR_BATCH_SIZE)
+    ]
+    try:
+        results = await asyncio.gather(
+            *(_request_hourly_guarded(kind, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
 
-    return 60
+        expires_at = next_refresh()
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException) and not isinstance(result, CircuitOpenError):
+                log.warning("forecast fetch of %d %s cells failed: %r", len(chunk), kind, result)
+
+            for i, cell in enumerate(chunk):
+                _inflight.pop((kind, *cell), None)
+                fut = futures[cell]
+                if fut.done():
+                    continue
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                else:
+                    forecast_cache.set((kind, *cell), result[i], expires_at=expires_at)
+                    fut.set_result(result[i])
+    finally:
+        _abandon(kind, futures)
+
+
+async def cancel_revalidations() -> None:
+    """Stop background fetches; on shutdown, before the upstream clients close."""
+    tasks = list(_revalidations)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _last_known(kind: str, cell: Tuple[float, float], stored=None) -> CellForecast:
+    """
+    Best series for a cell that could not be refreshed in time: the newer
+    of the cache's expired entry and the store's, else nothing.
+    """
+    candidates = [c for c in (forecast_cache.get_stale((kind, *cell)), stored) if c is not None]
+    if not candidates:
+        WEATHER_DEGRADED.labels(kind, "fallback").inc()
+        return CellForecast(None)
+
+    series, expires_at = max(candidates, key=lambda c: c[1])
+    now = time.time()
+    if expires_at > now:
+        # Refreshed by someone else in the meantime
+        return CellForecast(series)
+
+    WEATHER_DEGRADED.labels(kind, "stale").inc()
+    return CellForecast(series, int(now - expires_at))
+
+
+async def _fetch_hourly_many(kind: str, cells: List[Tuple[float, float]]) -> Dict[Tuple[float, float], CellForecast]:
+    """
+    Return {cell: CellForecast} for already-snapped cells. Cache misses
+    are read from the shared forecast store, and what it lacks is fetched
+    in batches of CORRIDOR_BATCH_SIZE, concurrently; cells another caller
+    is already fetching are awaited instead of re-requested.
+
+    Waiting is bounded by the request's weather budget: cells not in by
+    the deadline, or whose fetch failed, get their last-known series
+    marked stale (or none at all), while slow fetches carry on in the
+    background and refresh the cache for later requests.
+    """
+    deadline = _deadline.get() or time.monotonic() + WEATHER_BUDGET_S
+    out = {}
+    waiting = {}
+    missing = []
+
+    for cell in dict.fromkeys(cells):
+        key = (kind, *cell)
+        series = forecast_cache.get(key)
+        if series is not None:
+            out[cell] = CellForecast(series)
+        elif key in _inflight:
+            waiting[cell] = _inflight[key]
+        else:
+            missing.append(cell)
+
+    stored_stale = {}
+    if missing:
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for cell in missing:
+            fut = futures[cell] = _inflight[(kind, *cell)] = loop.create_future()
+            # Nobody may be left waiting when the fetch fails
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        # Series the prefetcher (or another replica) already stored
+        try:
+            stored = await load_series(kind, missing, FORECAST_STALE_MAX_S)
+        except BaseException:
+            _abandon(kind, futures)
+            raise
+
+        now = time.time()
+        for cell, (series, expires_at) in stored.items():
+            if expires_at <= now:
+                stored_stale[cell] = (series, expires_at)
+                continue
+            forecast_cache.set((kind, *cell), series, expires_at=expires_at)
+            _inflight.pop((kind, *cell), None)
+            futures[cell].set_result(series)
+            out[cell] = CellForecast(series)
+
+        remaining = [cell for cell in missing if cell not in out]
+        if remaining:
+            task = asyncio.ensure_future(_revalidate(kind, remaining, futures))
+            _revalidations.add(task)
+            task.add_done_callback(_revalidations.discard)
+            waiting.update((cell, futures[cell]) for cell in remaining)
+
+    if waiting:
+        await asyncio.wait(waiting.values(), timeout=max(0.0, deadline - time.monotonic()))
+        for cell, fut in waiting.items():
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                out[cell] = CellForecast(fut.result())
+            else:
+                out[cell] = _last_known(kind, cell, stored_stale.get(cell))
+
+    return out
+
+
+async def _fetch_hourly(kind: str, lat: float, lon: float) -> CellForecast:
+    """
+    Return the full hourly series for the grid cell
+    containing (lat, lon), served from the forecast cache when possible.
+    """
+    cell = snap_to_cell(lat, lon)
+    return (await _fetch_hourly_many(kind, [cell]))[cell]
+
+
+async def _value_once(kind: str, lat: float, lon: float, at: dt.datetime, fallback: float):
+    """(value, degraded, stale_age_s) for one point and time."""
+    forecast = await _fetch_hourly(kind, lat, lon)
+
+    value = None
+    if forecast.series is not None:
+        value = forecast.series.value_at(ensure_aware(at).timestamp())
+    if value is None:
+        return fallback, True, None
+    return value, forecast.stale_age_s is not None, forecast.stale_age_s
+
+
+def _max_age(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    return a if b is None else b if a is None else max(a, b)
+
+
+class PointWeather(NamedTuple):
+    temp_c: float
+    aqi: int
+    # Either value not from a current forecast, as for route segments
+    degraded: bool
+    stale_age_s: Optional[int]
+
+
+async def point_weather(lat: float, lon: float, at: dt.datetime) -> PointWeather:
+    """Temperature and AQI for one point and time, both kinds fetched concurrently."""
+    (temp, temp_bad, temp_age), (aqi, aqi_bad, aqi_age) = await asyncio.gather(
+        _value_once("temperature", lat, lon, at, FALLBACK_TEMP_C),
+        _value_once("aqi", lat, lon, at, FALLBACK_AQI),
+    )
+    return PointWeather(float(temp), int(round(aqi)), temp_bad or aqi_bad, _max_age(temp_age, aqi_age))
 
 
 def _compute_hori(temp_c: float, aqi: int):
-    aqi_pen = 0.12 * min(aqi, 500)
-    heat = max(0, temp_c - 25) * 1.2
-    cold = max(0, 5 - temp_c) * 2.0
+    return score_point(temp_c, aqi)
+
+
+def _bulk_budget_s(cell_count: int) -> float:
+    """Weather budget for `cell_count` cells: one WEATHER_BUDGET_S per round of fetch slots."""
+    calls = len(_FORECAST_SOURCES) * math.ceil(cell_count / CORRIDOR_BATCH_SIZE)
+    waves = max(1, math.ceil(calls / FORECAST_FETCH_CONCURRENCY))
+    return max(WEATHER_BUDGET_S, min(WEATHER_BULK_BUDGET_S, waves * WEATHER_BUDGET_S))
+
+
+async def score_points(lats: List[float], lons: List[float], epochs: List[float]):
+    """
+    Weather and HORI for many independent points at once. Points are
+    grouped by grid cell, both kinds are fetched concurrently in
+    multi-location batches, and all points are scored in one call.
+    Returns (temps, aqis, BatchScore, degraded, stale_age_s).
+    """
+    cells = [snap_to_cell(lat, lon) for lat, lon in zip(lats, lons)]
+    with weather_budget(_bulk_budget_s(len(set(cells)))):
+        temp_series, aqi_series = await asyncio.gather(
+            _fetch_hourly_many("temperature", cells),
+            _fetch_hourly_many("aqi", cells),
+        )
+
+    temps, aqis, degraded, ages = _weather_along(temp_series, aqi_series, cells, epochs)
+    return temps, aqis, score_batch(temps, aqis), degraded, ages
 
-    score = max(0, min(100, 100 - (aqi_pen + heat + cold)))
 
-    reasons = {
-        "air_quality": aqi_pen,
-        "heat": heat,
-        "cold": cold,
-        "ok": 0,
+# ---- Main HORI Enrichment ----
+def _corridor_cells(points: List[SegmentPoint]) -> List[Tuple[float, float]]:
+    """
+    Map every route point to the grid cell whose forecast it will use.
+
+    Points are deduped into cells in route order. If the route crosses more
+    cells than CORRIDOR_MAX_CALLS allows, an evenly spaced subset is kept
+    and every point falls back to the nearest kept cell along the route.
+    """
+    point_cells = [snap_to_cell(p.lat, p.lon) for p in points]
+    unique = list(dict.fromkeys(point_cells))
+
+    calls_per_kind = max(1, CORRIDOR_MAX_CALLS // len(_FORECAST_SOURCES))
+    max_cells = calls_per_kind * CORRIDOR_BATCH_SIZE
+    if len(unique) <= max_cells:
+        return point_cells
+
+    step = (len(unique) - 1) / max(1, max_cells - 1)
+    kept = [unique[round(i * step)] for i in range(max_cells)]
+
+    order = {cell: i for i, cell in enumerate(unique)}
+    remap = {
+        cell: kept[min(round(order[cell] / step), len(kept) - 1)]
+        for cell in unique
     }
+    return [remap[c] for c in point_cells]
+
+
+async def prefetch_corridors(routes: List[List[SegmentPoint]]) -> None:
+    """
+    Warm the forecast cache for several candidate routes at once, so
+    overlapping corridors share one multi-location fetch per kind.
+    """
+    cells = list(dict.fromkeys(c for points in routes for c in _corridor_cells(points)))
+    await asyncio.gather(
+        _fetch_hourly_many("temperature", cells),
+        _fetch_hourly_many("aqi", cells),
+    )
 
-    reason = max(["air_quality", "heat", "cold"], key=lambda k: reasons[k])
-    if reasons[reason] < 1:
-        reason = "ok"
 
-    return int(round(score)), reason
+def _values_along(forecasts: dict, point_cells: list, etas: List[float], default: float):
+    """
+    Look up every point's ETA in its cell's series, one vector call per
+    cell. Returns (values, degraded, stale_age_s) lists; points without a
+    value get `default` and count as degraded, as do stale ones.
+    """
+    idx_by_cell = {}
+    for i, cell in enumerate(point_cells):
+        idx_by_cell.setdefault(cell, []).append(i)
+
+    n = len(point_cells)
+    out = [default] * n
+    degraded = [True] * n
+    ages: List[Optional[int]] = [None] * n
+    for cell, idxs in idx_by_cell.items():
+        series, age = forecasts[cell]
+        if series is None:
+            continue
+        for i, v in zip(idxs, series.values_at(etas[i] for i in idxs)):
+            if v is not None:
+                out[i] = v
+                degraded[i] = age is not None
+                ages[i] = age
+    return out, degraded, ages
+
+
+def _weather_along(temp_forecasts: dict, aqi_forecasts: dict, point_cells: list, etas: List[float]):
+    """Temps, AQIs and per-point (degraded, stale_age_s) flags, either kind counting."""
+    temps, temp_bad, temp_age = _values_along(temp_forecasts, point_cells, etas, FALLBACK_TEMP_C)
+    aqis, aqi_bad, aqi_age = _values_along(aqi_forecasts, point_cells, etas, FALLBACK_AQI)
+
+    degraded = [a or b for a, b in zip(temp_bad, aqi_bad)]
+    ages = [_max_age(a, b) for a, b in zip(temp_age, aqi_age)]
+    return temps, [int(round(v)) for v in aqis], degraded, ages
 
 
-# ---- Main HORI Enrichment ----
 async def enrich_segments_with_eta(points: List[SegmentPoint], depart_iso: str, duration_min: float):
     depart_utc = parse_iso(depart_iso)
     total_s = duration_min * 60
 
+    if HORI_ENRICH_MODE == "midpoint":
+        return await _enrich_midpoint(points, depart_utc, total_s)
+
+    point_cells = _corridor_cells(points)
+    temp_series, aqi_series = await asyncio.gather(
+        _fetch_hourly_many("temperature", point_cells),
+        _fetch_hourly_many("aqi", point_cells),
+    )
+
+    depart_s = depart_utc.timestamp()
+    etas = [depart_s + p.frac * total_s for p in points]
+    temps, aqis, degraded, ages = _weather_along(temp_series, aqi_series, point_cells, etas)
+
+    return _score_segments(points, etas, temps, aqis, degraded, ages, depart_utc, total_s)
+
+
+async def sweep_departures(points: List[SegmentPoint], departs: List[float], duration_min: float):
+    """
+    Route HORI for every departure time (epoch seconds) in `departs`,
+    from one corridor fetch: all departures x points are looked up in the
+    same series and scored as one matrix. Returns (SweepScore, degraded,
+    stale_age_s), the flags aggregated per departure like a route summary.
+    """
+    total_s = duration_min * 60
+    point_cells = _corridor_cells(points)
+    temp_series, aqi_series = await asyncio.gather(
+        _fetch_hourly_many("temperature", point_cells),
+        _fetch_hourly_many("aqi", point_cells),
+    )
+
+    offsets = [p.frac * total_s for p in points]
+    etas = [d + off for d in departs for off in offsets]
+    cells = point_cells * len(departs)
+
+    n = len(points)
+    temps, aqis, degraded, ages = _weather_along(temp_series, aqi_series, cells, etas)
+
+    rows = range(0, len(temps), n)
+    stale = [[a for a in ages[i:i + n] if a is not None] for i in rows]
+
+    weights = segment_weights([p.frac for p in points], duration_min)
+    res = score_sweep(
+        [temps[i:i + n] for i in rows],
+        [aqis[i:i + n] for i in rows],
+        weights,
+    )
+    return res, [any(degraded[i:i + n]) for i in rows], [max(a) if a else None for a in stale]
+
+
+async def _enrich_midpoint(points: List[SegmentPoint], depart_utc: dt.datetime, total_s: float):
     # Compute weather once from midpoint
     mid = points[len(points) // 2]
 
-    temp = await _fetch_temp_once(mid.lat, mid.lon, depart_utc)
-    aqi = await _fetch_aqi_once(mid.lat, mid.lon, depart_utc)
-    hori_score, reason = _compute_hori(temp, aqi)
-
-    enriched = []
-
-    for p in points:
-        eta = depart_utc + dt.timedelta(seconds=p.frac * total_s)
-        eta = ensure_aware(eta)
-
-        enriched.append(
-            HoriSegment(
-                lon=p.lon,
-                lat=p.lat,
-                ts=_iso(eta),
-                temp_c=temp,
-                aqi=aqi,
-                hori=hori_score,
-                reason=reason,
-            )
-        )
+    w = await point_weather(mid.lat, mid.lon, depart_utc)
+
+    depart_s = depart_utc.timestamp()
+    etas = [depart_s + p.frac * total_s for p in points]
+
+    n = len(points)
+    return _score_segments(
+        points, etas, [w.temp_c] * n, [w.aqi] * n,
+        [w.degraded] * n, [w.stale_age_s] * n,
+        depart_utc, total_s,
+    )
+
+
+def _build_segments(points, etas, temps, aqis, res, degraded, ages) -> SegmentColumns:
+    return SegmentColumns(
+        lon=[p.lon for p in points],
+        lat=[p.lat for p in points],
+        eta=list(etas),
+        temp_c=list(temps),
+        aqi=list(aqis),
+        hori=list(res.scores),
+        reason=list(res.reason_codes),
+        degraded=list(degraded),
+        stale_age_s=list(ages),
+    )
+
 
-    summary = HoriSummary(
-        avg_hori=hori_score,
-        worst_hori=hori_score,
-        worst_idx=0,
-        max_aqi=aqi,
-        avg_temp_c=temp,
+def _summary(res, degraded, ages) -> HoriSummary:
+    stale = [a for a in ages if a is not None]
+    return HoriSummary(
+        avg_hori=res.avg_hori,
+        worst_hori=res.worst_hori,
+        worst_idx=res.worst_idx,
+        max_aqi=res.max_aqi,
+        avg_temp_c=res.avg_temp_c,
+        exposure_min=res.exposure,
+        degraded=any(degraded),
+        stale_age_s=max(stale) if stale else None,
     )
 
+
+def _score_segments(points, etas, temps, aqis, degraded, ages, depart_utc: dt.datetime, total_s: float):
+    """Score all segments in one batch; returns (SegmentColumns, HoriSummary, arrive)."""
+    weights = segment_weights([p.frac for p in points], total_s / 60)
+    res = score_batch(temps, aqis, weights)
+
+    enriched = _build_segments(points, etas, temps, aqis, res, degraded, ages)
+    summary = _summary(res, degraded, ages)
+
     arrive = ensure_aware(depart_utc + dt.timedelta(seconds=total_s))
 
     return enriched, summary, arrive
+
+
+# ---- Streaming Enrichment ----
+def _cell_blocks(point_cells: list) -> List[Tuple[int, int]]:
+    """
+    Split the route into contiguous [lo, hi) point ranges of at most
+    CORRIDOR_BATCH_SIZE distinct cells each, so every block costs one
+    multi-location call per kind, like the non-streaming path.
+    """
+    blocks = []
+    lo, seen = 0, set()
+    for i, cell in enumerate(point_cells):
+        if cell not in seen and len(seen) >= CORRIDOR_BATCH_SIZE:
+            blocks.append((lo, i))
+            lo, seen = i, set()
+        seen.add(cell)
+    if point_cells:
+        blocks.append((lo, len(point_cells)))
+    return blocks
+
+
+async def enrich_segments_stream(points: List[SegmentPoint], depart_iso: str, duration_min: float):
+    """
+    Async generator form of enrich_segments_with_eta. Yields
+    ("segments", offset, SegmentColumns) for each block of the route as its
+    weather arrives (in completion order), then ("summary", HoriSummary,
+    arrive) once all blocks are in.
+    """
+    depart_utc = parse_iso(depart_iso)
+    total_s = duration_min * 60
+
+    if HORI_ENRICH_MODE == "midpoint":
+        enriched, summary, arrive = await _enrich_midpoint(points, depart_utc, total_s)
+        yield "segments", 0, enriched
+        yield "summary", summary, arrive
+        return
+
+    point_cells = _corridor_cells(points)
+    depart_s = depart_utc.timestamp()
+    etas = [depart_s + p.frac * total_s for p in points]
+
+    async def run_block(lo: int, hi: int):
+        cells = point_cells[lo:hi]
+        temp_series, aqi_series = await asyncio.gather(
+            _fetch_hourly_many("temperature", cells),
+            _fetch_hourly_many("aqi", cells),
+        )
+        return (lo, hi, *_weather_along(temp_series, aqi_series, cells, etas[lo:hi]))
+
+    n = len(points)
+    temps_all: List[float] = [FALLBACK_TEMP_C] * n
+    aqis_all: List[int] = [FALLBACK_AQI] * n
+    degraded_all: List[bool] = [True] * n
+    ages_all: List[Optional[int]] = [None] * n
+
+    tasks = [asyncio.ensure_future(run_block(lo, hi)) for lo, hi in _cell_blocks(point_cells)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            lo, hi, temps, aqis, degraded, ages = await next_done
+            temps_all[lo:hi] = temps
+            aqis_all[lo:hi] = aqis
+            degraded_all[lo:hi] = degraded
+            ages_all[lo:hi] = ages
+
+            # Per-point scores do not depend on weights; those only feed the summary
+            res = score_batch(temps, aqis)
+            yield "segments", lo, _build_segments(points[lo:hi], etas[lo:hi], temps, aqis, res, degraded, ages)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    weights = segment_weights([p.frac for p in points], duration_min)
+    arrive = ensure_aware(depart_utc + dt.timedelta(seconds=total_s))
+    yield "summary", _summary(score_batch(temps_all, aqis_all, weights), degraded_all, ages_all), arrive
+
+
+# ---- Upstream health ----
+def upstream_stats() -> dict:
+    return {
+        "budget_s": WEATHER_BUDGET_S,
+        "hedge_after_s": WEATHER_HEDGE_AFTER_S,
+        "revalidating": len(_revalidations),
+        "breakers": {name: b.stats() for name, b in _breakers.items()},
+    }
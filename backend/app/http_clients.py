@@ -0,0 +1,109 @@
+# app/http_clients.py
+import os
+from dataclasses import dataclass
+from typing import Dict
+
+import httpx
+
+
+# ---- Upstream configuration ----
+@dataclass(frozen=True)
+class UpstreamConfig:
+    name: str
+    base_url: str
+    timeout: float
+    max_connections: int
+    max_keepalive: int
+    http2: bool
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _upstream(name: str, base_url: str, timeout: float, http2: bool) -> UpstreamConfig:
+    """Build the config for one upstream, overridable via <NAME>_* env vars."""
+    prefix = name.upper()
+    return UpstreamConfig(
+        name=name,
+        base_url=os.getenv(f"{prefix}_URL", base_url),
+        timeout=_env_float(f"{prefix}_TIMEOUT", _env_float("HTTP_TIMEOUT", timeout)),
+        max_connections=_env_int(f"{prefix}_MAX_CONNECTIONS", 100),
+        max_keepalive=_env_int(f"{prefix}_MAX_KEEPALIVE", 20),
+        http2=_env_bool(f"{prefix}_HTTP2", http2),
+    )
+
+
+# OSRM runs inside the cluster over plain HTTP, so HTTP/2 stays off there.
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    cfg.name: cfg
+    for cfg in (
+        _upstream("open_meteo", "https://api.open-meteo.com", 10.0, True),
+        _upstream("air_quality", "https://air-quality-api.open-meteo.com", 10.0, True),
+        _upstream("osrm", "http://osrm:5000", 10.0, False),
+        _upstream("nominatim", "https://nominatim.openstreetmap.org", 10.0, True),
+    )
+}
+
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "HORI-App/1.0 (contact@example.com)")
+
+
+# ---- Client registry ----
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(cfg: UpstreamConfig) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=cfg.base_url,
+        timeout=cfg.timeout,
+        limits=httpx.Limits(
+            max_connections=cfg.max_connections,
+            max_keepalive_connections=cfg.max_keepalive,
+        ),
+        http2=cfg.http2,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
+async def start_clients() -> None:
+    """Open one long-lived client per upstream (called from the app lifespan)."""
+    for name, cfg in UPSTREAMS.items():
+        if name not in _clients:
+            _clients[name] = _build_client(cfg)
+
+
+async def close_clients() -> None:
+    """Close every pooled client and drop it from the registry."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    Return the pooled client for an upstream.
+
+    Clients are created lazily as well, so scripts that never run the
+    FastAPI lifespan can still reuse one connection pool.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(UPSTREAMS[name])
+    return client
@@ -2,19 +2,38 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Literal, Optional
 from datetime import datetime, timezone
-import httpx
+from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import json
+import logging
 
-from app.routers import hori_router
+from app.routers import hori_router, tiles_router
 from app.models import TripSummaryOut, TripDetailOut
 
-from .database import SessionLocal, engine
-from .db_models import Base, Trip, Segment, SearchedPoint
+from .database import engine, async_engine, AsyncSessionLocal, get_db
+from .http_clients import start_clients, close_clients
+from .forecast_cache import forecast_cache
+from .tiles import tile_cache, tile_flight
+from .osrm import route_cache, route_flight
+from .write_behind import write_behind, WRITE_BEHIND
+from .prefetch import prefetcher, FORECAST_PREFETCH
+from .db_models import Trip, SearchedPoint
+from .migrations import upgrade_schema
+from .metrics import MetricsMiddleware, CacheCollector, instrument_engine, register_collector
+from .pagination import PAGE_MAX_LIMIT, NEXT_CURSOR_HEADER, PageError, keyset_page, page_response, select_fields
+from . import geocoding, forecast_store, hori
+from .persistence import persist_trip, persist_point
+from .route_service import plan_route, trip_values, route_response, route_columnar
+from .trip_codec import trip_segments
+from .trip_cache import trip_body_cache, trip_headers, etag_matches
 from .models import (
     RouteRequest,
     HoriRouteResponse,
@@ -22,19 +41,47 @@ from .models import (
 )
 
 from .hori import (
-    enrich_segments_with_eta,
-    _fetch_temp_once,
-    _fetch_aqi_once,
+    point_weather,
     _compute_hori,
 )
 
+log = logging.getLogger(__name__)
+
 
 # ============================================================
 # FASTAPI + DB INIT
 # ============================================================
 
-app = FastAPI(title="HORI Backend API", openapi_prefix="/api")
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled, keep-alive client per upstream for the whole process
+    await start_clients()
+    if WRITE_BEHIND:
+        write_behind.start()
+    # Keep the shared forecast store warm for the whole routing region
+    if FORECAST_PREFETCH:
+        prefetcher.start()
+
+    # Known place names answer /search prefixes without Nominatim
+    try:
+        async with AsyncSessionLocal() as db:
+            await geocoding.seed_index(db)
+    except Exception:
+        log.exception("geocoding index seed failed")
+    try:
+        yield
+    finally:
+        await prefetcher.stop()
+        # Drain queued trips/points before the pool goes away
+        await write_behind.stop()
+        # Background weather fetches still use the pooled clients
+        await hori.cancel_revalidations()
+        await close_clients()
+        await async_engine.dispose()
+
+
+app = FastAPI(title="HORI Backend API", openapi_prefix="/api", lifespan=lifespan)
+upgrade_schema(engine)
 
 # ✅ FIXED CORS — correct syntax
 app.add_middleware(
@@ -43,17 +90,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(hori_router.router)
+app.include_router(tiles_router.router)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# ============================================================
+# METRICS (Prometheus)
+# ============================================================
+
+instrument_engine(async_engine.sync_engine)
+register_collector(CacheCollector(
+    caches=lambda: {
+        "forecast": forecast_cache,
+        "route": route_cache,
+        "geocode": geocoding.geocode_cache,
+        "tile": tile_cache,
+        "trip_body": trip_body_cache,
+    },
+    flights=lambda: {
+        "route": route_flight,
+        "geocode": geocoding.geocode_flight,
+        "tile": tile_flight,
+    },
+    write_behind=write_behind,
+    engine=async_engine.sync_engine,
+))
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 # ============================================================
@@ -77,25 +148,15 @@ def parse_stop_names(raw):
 @app.get("/search")
 async def search_address(q: str = Query(..., min_length=2)):
 
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"format": "json", "addressdetails": 1, "q": q, "limit": 8}
-    headers = {"User-Agent": "HORI-App/1.0 (contact@example.com)"}
-
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url, params=params, headers=headers)
-
-    if r.status_code != 200:
-        raise HTTPException(500, f"Nominatim Error {r.status_code}")
-
-    results = []
-    for item in r.json():
-        results.append({
-            "place_name": item.get("display_name"),
-            "lat": float(item.get("lat")),
-            "lon": float(item.get("lon")),
-        })
+    try:
+        places = await geocoding.geocode(q, limit=8)
+    except geocoding.GeocodeError as e:
+        raise HTTPException(500, f"Nominatim Error {e.status_code}")
 
-    return results
+    return [
+        {"place_name": name, "lat": lat, "lon": lon}
+        for name, lat, lon in places
+    ]
 
 
 # ============================================================
@@ -107,6 +168,46 @@ def root():
     return {"status": "ok", "msg": "HORI backend running"}
 
 
+# ============================================================
+# CACHE STATS
+# ============================================================
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "forecast": forecast_cache.stats(),
+        "forecast_store": forecast_store.stats(),
+        "route": {**route_cache.stats(), **route_flight.stats()},
+        "geocode": geocoding.stats(),
+        "trip_body": trip_body_cache.stats(),
+    }
+
+
+@app.get("/write-behind/stats")
+def write_behind_stats():
+    return write_behind.stats()
+
+
+@app.get("/upstreams/stats")
+def upstream_stats():
+    """Weather latency budget, hedging and circuit breaker state."""
+    return hori.upstream_stats()
+
+
+@app.get("/forecast/freshness")
+async def forecast_freshness(db: AsyncSession = Depends(get_db)):
+    """How much of the routing region the shared forecast store covers, and how old it is."""
+    kinds = await forecast_store.freshness(db)
+    region = len(prefetcher.cells)
+    for k in kinds.values():
+        k["coverage"] = round(min(1.0, k["fresh"] / region), 4) if region else 0.0
+    return {
+        "kinds": kinds,
+        "prefetcher": prefetcher.stats(),
+        "store": forecast_store.stats(),
+    }
+
+
 # ============================================================
 # HORI POINT
 # ============================================================
@@ -117,18 +218,18 @@ async def hori_point(lat: float, lon: float):
 
 
 async def _compute_point_hori(lat: float, lon: float):
-    now = datetime.now(timezone.utc)
-    temp_c = await _fetch_temp_once(lat, lon, now)
-    aqi = await _fetch_aqi_once(lat, lon, now)
-    hori_val, reason = _compute_hori(temp_c, aqi)
+    w = await point_weather(lat, lon, datetime.now(timezone.utc))
+    hori_val, reason = _compute_hori(w.temp_c, w.aqi)
 
     return {
         "lat": lat,
         "lon": lon,
-        "temp_c": temp_c,
-        "aqi": aqi,
+        "temp_c": w.temp_c,
+        "aqi": w.aqi,
         "hori": hori_val,
         "reason": reason,
+        "degraded": w.degraded,
+        "stale_age_s": w.stale_age_s,
     }
 
 
@@ -141,12 +242,12 @@ async def save_point_hori(
     lat: float,
     lon: float,
     place_name: str = Query("Unknown location"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
 
     data = await _compute_point_hori(lat, lon)
 
-    entry = SearchedPoint(
+    values = dict(
         place_name=place_name,
         lat=lat,
         lon=lon,
@@ -154,13 +255,12 @@ async def save_point_hori(
         aqi=data["aqi"],
         hori=data["hori"],
         reason=data["reason"],
+        degraded=data["degraded"],
+        stale_age_s=data["stale_age_s"],
         created_at=datetime.utcnow(),
     )
 
-    db.add(entry)
-    db.commit()
-    db.refresh(entry)
-    return entry
+    return await persist_point(db, values)
 
 
 # ============================================================
@@ -168,18 +268,26 @@ async def save_point_hori(
 # ============================================================
 
 @app.get("/searched", response_model=List[SearchedPointOut])
-def list_searched(limit: int = 50, db: Session = Depends(get_db)):
-    return (
-        db.query(SearchedPoint)
-        .order_by(SearchedPoint.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+async def list_searched(
+    limit: int = Query(50, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        columns = select_fields(SearchedPointOut.model_fields, fields)
+        rows, next_cursor = await keyset_page(db, SearchedPoint, columns, limit, cursor, since, until)
+    except PageError as e:
+        raise HTTPException(400, str(e))
+
+    return page_response(rows, next_cursor)
 
 
 @app.get("/searched/{point_id}", response_model=SearchedPointOut)
-def get_searched(point_id: int, db: Session = Depends(get_db)):
-    p = db.query(SearchedPoint).filter(SearchedPoint.id == point_id).first()
+async def get_searched(point_id: int, db: AsyncSession = Depends(get_db)):
+    p = await db.get(SearchedPoint, point_id)
     if not p:
         raise HTTPException(404, "Not found")
     return p
@@ -190,74 +298,23 @@ def get_searched(point_id: int, db: Session = Depends(get_db)):
 # ============================================================
 
 @app.post("/hori/route", response_model=HoriRouteResponse)
-async def hori_route(req: RouteRequest, db: Session = Depends(get_db)):
-
-    from .osrm import get_osrm_route
-
-    seg_points, distance_km, duration_min = await get_osrm_route(
-        req.src, req.dst, req.stops
-    )
-
-    depart_utc = datetime.now(timezone.utc)
-
-    segments, summary, arrive_utc = await enrich_segments_with_eta(
-        seg_points, depart_utc, duration_min
-    )
-
-    depart_iso = depart_utc.isoformat()
-    arrive_iso = arrive_utc.isoformat()
-
-    trip = Trip(
-        src_lon=req.src[0],
-        src_lat=req.src[1],
-        dst_lon=req.dst[0],
-        dst_lat=req.dst[1],
-        distance_km=distance_km,
-        duration_min=duration_min,
-        avg_hori=summary.avg_hori,
-        worst_hori=summary.worst_hori,
-        worst_idx=summary.worst_idx,
-        max_aqi=summary.max_aqi,
-        avg_temp_c=summary.avg_temp_c,
-        depart_iso=depart_iso,
-        arrive_iso=arrive_iso,
-        created_at=datetime.utcnow(),
+async def hori_route(
+    req: RouteRequest,
+    format: Literal["json", "columnar"] = "json",
+    db: AsyncSession = Depends(get_db),
+):
 
-        # NEW
-        src_name=req.src_name,
-        dst_name=req.dst_name,
-        stop_names=json.dumps(req.stop_names or []),
-    )
+    routes = await plan_route(req)
+    best = routes[0]
 
-    db.add(trip)
-    db.commit()
-    db.refresh(trip)
-
-    for idx, seg in enumerate(segments):
-        db.add(
-            Segment(
-                trip_id=trip.id,
-                idx=idx,
-                lon=seg.lon,
-                lat=seg.lat,
-                ts=seg.ts,
-                temp_c=seg.temp_c,
-                aqi=seg.aqi,
-                hori=seg.hori,
-                reason=seg.reason,
-            )
-        )
+    # Trip + all segments in one bulk transaction (or queued, write-behind)
+    trip_id = await persist_trip(db, trip_values(req, best), best.segments)
 
-    db.commit()
+    if format == "columnar":
+        # Parallel arrays, no per-segment validation, orjson-encoded
+        return ORJSONResponse(route_columnar(routes, trip_id))
 
-    return HoriRouteResponse(
-        segments=segments,
-        summary=summary,
-        distance_km=distance_km,
-        duration_min=duration_min,
-        depart_iso=depart_iso,
-        arrive_iso=arrive_iso,
-    )
+    return route_response(routes, trip_id)
 
 
 # ============================================================
@@ -265,20 +322,27 @@ async def hori_route(req: RouteRequest, db: Session = Depends(get_db)):
 # ============================================================
 
 @app.get("/trips", response_model=List[TripSummaryOut])
-def list_trips(limit: int = 20, db: Session = Depends(get_db)):
-
-    trips = (
-        db.query(Trip)
-        .order_by(Trip.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+async def list_trips(
+    limit: int = Query(20, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Newest first; pass back X-Next-Cursor as `cursor` for the next page
+    try:
+        columns = select_fields(TripSummaryOut.model_fields, fields)
+        rows, next_cursor = await keyset_page(db, Trip, columns, limit, cursor, since, until)
+    except PageError as e:
+        raise HTTPException(400, str(e))
 
     # FIX: convert DB text to list
-    for t in trips:
-        t.stop_names = parse_stop_names(t.stop_names)
+    for r in rows:
+        if "stop_names" in r:
+            r["stop_names"] = parse_stop_names(r["stop_names"])
 
-    return trips
+    return page_response(rows, next_cursor)
 
 
 # ============================================================
@@ -286,15 +350,36 @@ def list_trips(limit: int = 20, db: Session = Depends(get_db)):
 # ============================================================
 
 @app.get("/trips/{trip_id}", response_model=TripDetailOut)
-def get_trip(trip_id: int, db: Session = Depends(get_db)):
-
-    trip = db.query(Trip).filter(Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    # FIX JSON field
-    trip.stop_names = parse_stop_names(trip.stop_names)
-
-    trip.segments  # lazy load
-
-    return trip
+async def get_trip(trip_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+
+    body = trip_body_cache.get(trip_id)
+    degraded = False
+    if body is None:
+        # Trip + segments in one query (LEFT OUTER JOIN)
+        result = await db.execute(
+            select(Trip)
+            .options(joinedload(Trip.segments))
+            .where(Trip.id == trip_id)
+        )
+        trip = result.unique().scalar_one_or_none()
+        if not trip:
+            raise HTTPException(404, "Trip not found")
+
+        # FIX JSON field
+        trip.stop_names = parse_stop_names(trip.stop_names)
+
+        # Row-stored trips carry loaded `segments`; compact ones decode in place
+        out = TripSummaryOut.model_validate(trip, from_attributes=True).model_dump()
+        out["segments"] = trip_segments(trip)
+        body = TripDetailOut.model_validate(out, from_attributes=True).model_dump_json().encode()
+        # Not real forecast data: keep it out of caches that treat it as final
+        degraded = bool(trip.degraded)
+        if not degraded:
+            trip_body_cache.set(trip_id, body)
+
+    # Only an existing trip can match, so a guessed tag or "*" still 404s
+    headers = trip_headers(body, degraded)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
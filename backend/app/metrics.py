@@ -0,0 +1,212 @@
+# app/metrics.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ---- Metric definitions ----
+# Every label is a small fixed set (route templates, upstream names, SQL
+# verbs), so series count stays bounded; cache numbers are read from the
+# caches' own counters only at scrape time.
+
+REQUEST_LATENCY = Histogram(
+    "hori_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "hori_http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "hori_upstream_request_duration_seconds",
+    "Upstream call latency (OSRM, Open-Meteo, Nominatim)",
+    ["upstream"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPSTREAM_CALLS = Counter(
+    "hori_upstream_requests_total",
+    "Upstream calls by outcome",
+    ["upstream", "outcome"],
+)
+UPSTREAM_HEDGES = Counter(
+    "hori_upstream_hedges_total",
+    "Duplicate requests sent because the first was slow",
+    ["upstream"],
+)
+CIRCUIT_OPEN = Gauge(
+    "hori_upstream_circuit_open",
+    "1 while an upstream's circuit breaker is open or probing",
+    ["upstream"],
+)
+WEATHER_DEGRADED = Counter(
+    "hori_weather_degraded_total",
+    "Forecast cell lookups answered from a stale series or fallback values",
+    ["kind", "source"],
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "hori_db_query_duration_seconds",
+    "Time spent executing SQL statements",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_TRANSACTION_LATENCY = Histogram(
+    "hori_db_transaction_duration_seconds",
+    "Time from BEGIN to COMMIT/ROLLBACK",
+    ["outcome"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+
+# ---- HTTP middleware ----
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request Request/Response wrapping).
+    Latency is labelled with the matched route template, not the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                f"{status // 100}xx",
+            ).observe(time.perf_counter() - start)
+
+
+# ---- Upstreams ----
+@asynccontextmanager
+async def track_upstream(name: str):
+    """
+    Time one upstream call; exceptions count as errors. A cancelled call
+    (e.g. the losing side of a hedge) is counted as "cancelled" and kept
+    out of the latency histogram, since it says nothing about the upstream.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        UPSTREAM_CALLS.labels(name, "cancelled").inc()
+        raise
+    except Exception:
+        UPSTREAM_CALLS.labels(name, "error").inc()
+        UPSTREAM_LATENCY.labels(name).observe(time.perf_counter() - start)
+        raise
+    else:
+        UPSTREAM_CALLS.labels(name, "ok").inc()
+        UPSTREAM_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+def set_circuit_state(name: str, state: str) -> None:
+    CIRCUIT_OPEN.labels(name).set(0 if state == "closed" else 1)
+
+
+# ---- Database ----
+def instrument_engine(engine: Engine) -> None:
+    """Statement and transaction timings via SQLAlchemy connection events."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["metrics_query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "OTHER"
+        DB_QUERY_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.info["metrics_tx_start"] = time.perf_counter()
+
+    def _end(outcome):
+        def handler(conn):
+            start = conn.info.pop("metrics_tx_start", None)
+            if start is not None:
+                DB_TRANSACTION_LATENCY.labels(outcome).observe(time.perf_counter() - start)
+        return handler
+
+    event.listen(engine, "commit", _end("commit"))
+    event.listen(engine, "rollback", _end("rollback"))
+
+
+# ---- Caches (read at scrape time) ----
+class CacheCollector:
+    """
+    Exposes hit/miss/eviction counters and sizes of the in-process caches,
+    single-flight coalescing, the write-behind queue and the DB pool.
+    `caches` and `flights` are callables returning {name: object with
+    .stats()}, evaluated on every scrape.
+    """
+
+    def __init__(self, caches, flights, write_behind, engine):
+        self.caches = caches
+        self.flights = flights
+        self.write_behind = write_behind
+        self.engine = engine
+
+    def collect(self):
+        hits = CounterMetricFamily("hori_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("hori_cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("hori_cache_evictions", "Entries evicted for space", labels=["cache"])
+        entries = GaugeMetricFamily("hori_cache_entries", "Entries currently cached", labels=["cache"])
+        for name, cache in self.caches().items():
+            s = cache.stats()
+            hits.add_metric([name], s["hits"])
+            misses.add_metric([name], s["misses"])
+            evictions.add_metric([name], s["evictions"])
+            entries.add_metric([name], s["entries"])
+        yield from (hits, misses, evictions, entries)
+
+        calls = CounterMetricFamily("hori_singleflight_calls", "Calls actually started", labels=["flight"])
+        coalesced = CounterMetricFamily("hori_singleflight_coalesced", "Calls joined to one in flight", labels=["flight"])
+        for name, flight in self.flights().items():
+            s = flight.stats()
+            calls.add_metric([name], s["calls"])
+            coalesced.add_metric([name], s["coalesced"])
+        yield from (calls, coalesced)
+
+        wb = self.write_behind.stats()
+        yield GaugeMetricFamily("hori_write_behind_depth", "Jobs waiting to be flushed", value=wb["depth"])
+        yield CounterMetricFamily("hori_write_behind_failed", "Jobs whose flush failed", value=wb["failed"])
+
+        pool = self.engine.pool
+        if hasattr(pool, "checkedout"):
+            yield GaugeMetricFamily("hori_db_pool_checked_out", "Connections in use", value=pool.checkedout())
+
+
+def register_collector(collector) -> None:
+    REGISTRY.register(collector)
@@ -0,0 +1,61 @@
+# app/migrations.py
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .db_models import Base
+
+
+def add_missing_columns(engine: Engine) -> list:
+    """
+    `create_all` never alters existing tables, so add any nullable model
+    columns the database is missing. Returns the "table.column" names added.
+    """
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have or not col.nullable:
+                    continue
+
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+                added.append(f"{table.name}.{col.name}")
+
+    return added
+
+
+def add_missing_indexes(engine: Engine) -> list:
+    """
+    Create model indexes that existing tables lack (create_all only
+    indexes tables it creates). Returns the index names added.
+    """
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            have = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in have:
+                    continue
+                index.create(bind=conn)
+                added.append(index.name)
+
+    return added
+
+
+def upgrade_schema(engine: Engine) -> list:
+    """Create missing tables, then missing columns and indexes."""
+    Base.metadata.create_all(bind=engine)
+    return add_missing_columns(engine) + add_missing_indexes(engine)
@@ -1,5 +1,5 @@
 from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 
 Coord = List[float]
@@ -20,6 +20,41 @@ class RouteRequest(BaseModel):
 
     depart_iso: Optional[str] = None
 
+    # Alternative routes: how many extra OSRM candidates to score, and how
+    # much duration (vs. HORI exposure) weighs in the ranking (0..1)
+    alternatives: int = Field(0, ge=0, le=3)
+    duration_weight: float = Field(0.5, ge=0.0, le=1.0)
+
+
+class DepartureSweepRequest(RouteRequest):
+    # Candidate departures: depart_iso (default now) + every step_min
+    # minutes up to window_min later, both ends included
+    window_min: int = Field(360, ge=0, le=24 * 60)
+    step_min: int = Field(15, ge=5, le=180)
+
+
+class RouteBatchRequest(BaseModel):
+    routes: List[RouteRequest] = Field(..., min_length=1, max_length=500)
+    # False = score only, nothing is written to trips/segments
+    persist: bool = True
+
+
+class PointsRequest(BaseModel):
+    points: List[Coord] = Field(..., min_length=1, max_length=5000, description="[[lon, lat], ...]")
+    # Optional per-point ISO times (default: now) and place names
+    ts: Optional[List[str]] = None
+    place_names: Optional[List[str]] = None
+    # True = also insert every point into searched_points
+    persist: bool = False
+
+    @model_validator(mode="after")
+    def _same_lengths(self):
+        for name in ("ts", "place_names"):
+            column = getattr(self, name)
+            if column is not None and len(column) != len(self.points):
+                raise ValueError(f"{name} must have one entry per point")
+        return self
+
 
 class SegmentPoint(BaseModel):
     lon: float
@@ -40,6 +75,10 @@ class HoriSegment(BaseModel):
     aqi: int
     hori: int
     reason: Literal["air_quality", "heat", "cold", "ok"]
+    # True when temp/AQI are not from a current forecast: a stale series
+    # (stale_age_s = seconds since it expired) or fallback values (None)
+    degraded: bool = False
+    stale_age_s: Optional[int] = None
 
 
 class HoriSummary(BaseModel):
@@ -48,6 +87,20 @@ class HoriSummary(BaseModel):
     worst_idx: int
     max_aqi: int
     avg_temp_c: float
+    # Time-weighted exposure: minutes of the trip spent at full risk
+    exposure_min: float = 0.0
+    # Any segment degraded, and the oldest stale data used
+    degraded: bool = False
+    stale_age_s: Optional[int] = None
+
+
+class HoriRouteAlternative(BaseModel):
+    segments: List[HoriSegment]
+    summary: HoriSummary
+    distance_km: float
+    duration_min: float
+    arrive_iso: str
+    rank_score: float
 
 
 class HoriRouteResponse(BaseModel):
@@ -57,6 +110,50 @@ class HoriRouteResponse(BaseModel):
     duration_min: float
     depart_iso: str
     arrive_iso: str
+    trip_id: Optional[int] = None
+
+    # Set when alternatives were requested: this route's blended cost and
+    # the other candidates, best first (lower rank_score is better)
+    rank_score: Optional[float] = None
+    alternatives: Optional[List[HoriRouteAlternative]] = None
+
+
+class HoriPointsResponse(BaseModel):
+    """Columnar: entry i of every list belongs to request point i."""
+    count: int
+    lon: List[float]
+    lat: List[float]
+    ts: List[str]
+    temp_c: List[float]
+    aqi: List[int]
+    hori: List[int]
+    reason: List[str]
+    # Per point, as on route segments: not from a current forecast, and
+    # seconds since the stale series used expired
+    degraded: List[bool]
+    stale_age_s: List[Optional[int]]
+    ids: Optional[List[int]] = None  # searched_points ids when persisted
+
+
+class DepartureSlot(BaseModel):
+    depart_iso: str
+    arrive_iso: str
+    avg_hori: float
+    worst_hori: int
+    max_aqi: int
+    avg_temp_c: float
+    exposure_min: float
+    # Any point of this departure degraded, and the oldest stale data used
+    degraded: bool = False
+    stale_age_s: Optional[int] = None
+
+
+class DepartureSweepResponse(BaseModel):
+    distance_km: float
+    duration_min: float
+    slots: List[DepartureSlot]
+    # Lowest exposure_min; the earliest slot wins ties
+    best: DepartureSlot
 
 
 class Echo(BaseModel):
@@ -68,7 +165,7 @@ class Echo(BaseModel):
 # --------------------------
 
 class SegmentOut(BaseModel):
-    id: int
+    id: Optional[int] = None  # None for trips stored compactly
     idx: int
     lon: float
     lat: float
@@ -77,6 +174,9 @@ class SegmentOut(BaseModel):
     aqi: int
     hori: int
     reason: Literal["air_quality", "heat", "cold", "ok"]
+    # As on HoriSegment; None for trips saved before the flags were recorded
+    degraded: Optional[bool] = None
+    stale_age_s: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -105,6 +205,10 @@ class TripSummaryOut(BaseModel):
     worst_hori: int
     max_aqi: int
 
+    # As on HoriSummary; None for trips saved before the flags were recorded
+    degraded: Optional[bool] = None
+    stale_age_s: Optional[int] = None
+
     class Config:
         orm_mode = True
 
@@ -126,6 +230,9 @@ class SearchedPointOut(BaseModel):
     temp_c: float
     reason: str
     created_at: datetime
+    # None for points saved before the flags were recorded
+    degraded: Optional[bool] = None
+    stale_age_s: Optional[int] = None
 
     class Config:
         from_attributes = True
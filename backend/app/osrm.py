@@ -1,47 +1,106 @@
 # app/osrm.py
-import httpx
+import os
+
 import polyline
+from .http_clients import get_client
+from .metrics import track_upstream
 from .models import SegmentPoint
+from .resample import resample_route
+from .utils.singleflight import SingleFlight
+from .utils.ttl_cache import TTLCache
 
-# IMPORTANT FIX — use localhost instead of host.docker.internal
-OSRM_BASE_URL = "http://osrm:5000"
+OSRM_PROFILE = os.getenv("OSRM_PROFILE", "driving")
 
+# Coordinates are snapped before keying/querying (1e-4° ≈ 11 m)
+ROUTE_SNAP_DEG = float(os.getenv("ROUTE_SNAP_DEG", "0.0001"))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "1000"))
+ROUTE_CACHE_TTL_S = float(os.getenv("ROUTE_CACHE_TTL_S", str(6 * 3600)))
+
+# (profile, snapped coords, alternatives) -> ((points, distance_km, duration_min), ...)
+route_cache = TTLCache(max_entries=ROUTE_CACHE_MAX_ENTRIES, default_ttl=ROUTE_CACHE_TTL_S)
+route_flight = SingleFlight()
 
-async def get_osrm_route(src, dst, stops):
-    all_points = [src] + stops + [dst]
-    coords_str = ";".join([f"{lon},{lat}" for lon, lat in all_points])
 
-    url = (
-        f"{OSRM_BASE_URL}/route/v1/driving/{coords_str}"
-        "?overview=full&geometries=polyline6&steps=false"
+def _snap(coord) -> tuple:
+    lon, lat = coord
+    return (
+        round(round(lon / ROUTE_SNAP_DEG) * ROUTE_SNAP_DEG, 7),
+        round(round(lat / ROUTE_SNAP_DEG) * ROUTE_SNAP_DEG, 7),
     )
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(url)
+
+async def get_osrm_route(src, dst, stops, profile: str = OSRM_PROFILE):
+    """
+    Route through src → stops → dst. Results are cached per snapped
+    coordinates + profile, and concurrent identical misses share one
+    OSRM request.
+    """
+    points, distance_km, duration_min = (await get_osrm_routes(src, dst, stops, 0, profile))[0]
+    return points, distance_km, duration_min
+
+
+async def get_osrm_routes(src, dst, stops, alternatives: int = 0, profile: str = OSRM_PROFILE):
+    """
+    Like get_osrm_route, but returns up to 1 + `alternatives` candidate
+    routes in OSRM's order. OSRM only offers alternatives for routes
+    without intermediate stops.
+    """
+    coords = tuple(_snap(c) for c in [src] + list(stops) + [dst])
+    key = (profile, coords, max(0, alternatives))
+
+    cached = route_cache.get(key)
+    if cached is None:
+        cached = await route_flight.do(key, lambda: _fetch_and_cache(key))
+
+    return [(list(points), distance_km, duration_min) for points, distance_km, duration_min in cached]
+
+
+async def _fetch_and_cache(key):
+    profile, coords, alternatives = key
+    result = await _fetch_routes(coords, profile, alternatives)
+    route_cache.set(key, result)
+    return result
+
+
+async def _fetch_routes(all_points, profile: str, alternatives: int = 0):
+    coords_str = ";".join([f"{lon},{lat}" for lon, lat in all_points])
+
+    url = f"/route/v1/{profile}/{coords_str}"
+    params = {
+        "overview": "full",
+        "geometries": "polyline6",
+        "steps": "false",
+        "annotations": "duration",
+        "alternatives": str(alternatives) if alternatives else "false",
+    }
+
+    async with track_upstream("osrm"):
+        r = await get_client("osrm").get(url, params=params)
         r.raise_for_status()
-        data = r.json()
+    data = r.json()
 
     if "routes" not in data or not data["routes"]:
         raise Exception("Invalid OSRM response.")
 
-    route = data["routes"][0]
+    return tuple(_parse_route(route) for route in data["routes"][:1 + alternatives])
 
+
+def _parse_route(route: dict):
     geom = route.get("geometry")
     if not geom:
         raise Exception("No geometry returned from OSRM")
 
     decoded = polyline.decode(geom, precision=6)
 
-    total = len(decoded)
-    STEP = max(1, total // 200)
-    sampled = decoded[::STEP]
-    if sampled[-1] != decoded[-1]:
-        sampled.append(decoded[-1])
+    # Per-edge travel times let ETAs follow real speeds, not vertex count
+    seg_durations = []
+    for leg in route.get("legs", []):
+        seg_durations.extend(leg.get("annotation", {}).get("duration", []))
 
-    points = [
-        SegmentPoint(lon=lon, lat=lat, frac=i / max(1, len(sampled) - 1))
-        for i, (lat, lon) in enumerate(sampled)
-    ]
+    points = tuple(
+        SegmentPoint(lon=lon, lat=lat, frac=frac)
+        for lat, lon, frac in resample_route(decoded, seg_durations or None)
+    )
 
     distance_km = route["distance"] / 1000.0
     duration_min = route["duration"] / 60.0
@@ -0,0 +1,98 @@
+# app/pagination.py
+import base64
+import datetime as dt
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Page size bounds shared by the list endpoints
+PAGE_MAX_LIMIT = 500
+
+# Response header carrying the cursor of the next (older) page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: dt.datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[dt.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return dt.datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise PageError("invalid cursor")
+
+
+def select_fields(allowed: Iterable[str], fields: Optional[str]) -> List[str]:
+    """
+    Columns for a projection: the comma-separated `fields` (default: all
+    of `allowed`), always including the (created_at, id) cursor key.
+    """
+    allowed = list(allowed)
+    if not fields:
+        return allowed
+
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - set(allowed))
+    if unknown:
+        raise PageError(f"unknown fields: {', '.join(unknown)}")
+
+    keep = set(wanted) | {"id", "created_at"}
+    return [f for f in allowed if f in keep]
+
+
+async def keyset_page(
+    db: AsyncSession,
+    model,
+    columns: List[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    since: Optional[dt.datetime] = None,
+    until: Optional[dt.datetime] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Newest-first page of `columns` from `model`, resuming after `cursor`.
+
+    Rows are ordered on (created_at, id) and the cursor is a row-value
+    comparison against the last row sent, so each page is one range scan
+    of the composite index however deep the client pages. Returns the
+    rows as dicts plus the next cursor (None on the last page).
+    """
+    created_at, pk = model.created_at, model.id
+    query = select(*(getattr(model, c) for c in columns))
+
+    if since is not None:
+        query = query.where(created_at >= since)
+    if until is not None:
+        query = query.where(created_at < until)
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_at, pk) < tuple_(ts, row_id))
+
+    query = query.order_by(created_at.desc(), pk.desc()).limit(limit + 1)
+    rows = [dict(r) for r in (await db.execute(query)).mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+def page_response(rows: List[dict], next_cursor: Optional[str]) -> JSONResponse:
+    """
+    Rows as a plain JSON list (projections skip response_model checks);
+    the next page's cursor travels in NEXT_CURSOR_HEADER.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(jsonable_encoder(rows), headers=headers)
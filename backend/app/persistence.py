@@ -0,0 +1,170 @@
+# app/persistence.py
+import asyncio
+import os
+from typing import List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_models import Trip, Segment, SearchedPoint, utc_now
+from .scoring import REASONS
+from .trip_codec import SegmentColumns, as_columns, encode_segments
+from .write_behind import write_behind
+
+# "rows" = one segments row per point, "compact" = packed columns on trips
+TRIP_STORAGE = os.getenv("TRIP_STORAGE", "rows")
+
+
+def segment_rows(trip_id: int, segments: SegmentColumns) -> List[dict]:
+    """Plain column dicts for a bulk `insert(Segment)`."""
+    return [
+        {
+            "trip_id": trip_id,
+            "idx": idx,
+            "lon": lon,
+            "lat": lat,
+            "ts": ts,
+            "temp_c": temp,
+            "aqi": aqi,
+            "hori": score,
+            "reason": REASONS[code],
+            "degraded": bad,
+            "stale_age_s": age,
+        }
+        for idx, (lon, lat, ts, temp, aqi, score, code, bad, age) in enumerate(zip(
+            segments.lon, segments.lat, segments.timestamps(), segments.temp_c,
+            segments.aqi, segments.hori, segments.reason, segments.degraded, segments.stale_age_s,
+        ))
+    ]
+
+
+async def save_trip(db: AsyncSession, trip_values: dict, segments) -> int:
+    """
+    Persist a trip and all of its segments in a single transaction.
+
+    The trip id comes back via INSERT ... RETURNING and the segments go in
+    as one executemany (batched multi-row VALUES on Postgres), skipping
+    per-row ORM unit-of-work overhead. With TRIP_STORAGE=compact the
+    segments are packed into the trip row instead. `segments` is a
+    SegmentColumns or a list of HoriSegment. Returns the new trip id.
+    """
+    segments = as_columns(segments)
+    compact = TRIP_STORAGE == "compact"
+    if compact:
+        trip_values = {**trip_values, **encode_segments(segments)}
+
+    try:
+        trip_id = (await db.execute(
+            insert(Trip).values(**trip_values).returning(Trip.id)
+        )).scalar_one()
+
+        if len(segments) and not compact:
+            await db.execute(insert(Segment), segment_rows(trip_id, segments))
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return trip_id
+
+
+# ---- Up-front ids (write-behind) ----
+_id_lock = asyncio.Lock()
+_next_ids = {}
+
+
+async def allocate_ids(db: AsyncSession, model, count: int) -> List[int]:
+    """
+    Reserve `count` primary keys before the rows are written. Postgres
+    hands out values of the table's serial sequence; other backends fall
+    back to a per-process counter seeded from MAX(id), which is only safe
+    with a single writer (write-behind refuses to start on them).
+    """
+    table = model.__tablename__
+
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            {"table": table, "count": count},
+        )
+        return list(result.scalars())
+
+    async with _id_lock:
+        if table not in _next_ids:
+            current = (await db.execute(select(func.max(model.id)))).scalar()
+            _next_ids[table] = (current or 0) + 1
+        first = _next_ids[table]
+        _next_ids[table] += count
+        return list(range(first, first + count))
+
+
+async def allocate_id(db: AsyncSession, model) -> int:
+    return (await allocate_ids(db, model, 1))[0]
+
+
+async def persist_trip(db: AsyncSession, trip_values: dict, segments) -> int:
+    """
+    Save a trip, or with WRITE_BEHIND=true reserve its id and queue the
+    rows for the background flusher. Returns the trip id either way.
+    """
+    segments = as_columns(segments)
+    if not write_behind.running:
+        return await save_trip(db, trip_values, segments)
+
+    trip_id = await allocate_id(db, Trip)
+    trip_row = {"created_at": utc_now(), **trip_values, "id": trip_id}
+
+    if TRIP_STORAGE == "compact":
+        trip_row.update(encode_segments(segments))
+        job = [(Trip, [trip_row])]
+    else:
+        job = [(Trip, [trip_row]), (Segment, segment_rows(trip_id, segments))]
+
+    await write_behind.put(job)
+    return trip_id
+
+
+async def persist_point(db: AsyncSession, values: dict) -> SearchedPoint:
+    """
+    Save a searched point and return it. Under write-behind the returned
+    object is a detached SearchedPoint with its reserved id filled in.
+    """
+    if not write_behind.running:
+        row = SearchedPoint(**values)
+        db.add(row)
+        await db.commit()
+        await db.refresh(row)
+        return row
+
+    row_values = {"created_at": utc_now(), **values}
+    row_values["id"] = await allocate_id(db, SearchedPoint)
+
+    await write_behind.put([(SearchedPoint, [row_values])])
+    return SearchedPoint(**row_values)
+
+
+async def persist_points(db: AsyncSession, rows: List[dict]) -> List[int]:
+    """
+    Bulk-save searched points (one executemany with RETURNING) or queue
+    them as a single write-behind job. Returns ids in `rows` order.
+    """
+    if not write_behind.running:
+        try:
+            result = await db.execute(
+                insert(SearchedPoint).returning(SearchedPoint.id, sort_by_parameter_order=True),
+                rows,
+            )
+            ids = list(result.scalars())
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        return ids
+
+    ids = await allocate_ids(db, SearchedPoint, len(rows))
+    now = utc_now()
+    queued = [{"created_at": now, **row, "id": pk} for row, pk in zip(rows, ids)]
+
+    await write_behind.put([(SearchedPoint, queued)])
+    return ids
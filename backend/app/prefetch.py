@@ -0,0 +1,218 @@
+# app/prefetch.py
+"""
+Keep the shared forecast store filled for every grid cell of the routing
+region, so request-path weather lookups become local reads.
+
+    python -m app.prefetch [--once] [--bbox W,S,E,N] [--calls-per-min N]
+
+FORECAST_PREFETCH=true runs the same loop inside the backend process
+instead; one replica doing it is enough, the others only read the store
+(FORECAST_STORE=true, which the prefetching replica implies).
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import List, Optional, Tuple
+
+from .database import AsyncSessionLocal, engine
+from .forecast_cache import FORECAST_GRID_DEG, next_refresh, snap_to_cell
+from .forecast_store import save_series, stale_cells
+from .hori import _FORECAST_SOURCES, _request_hourly
+from .http_clients import start_clients, close_clients
+from .migrations import upgrade_schema
+
+log = logging.getLogger(__name__)
+
+FORECAST_PREFETCH = os.getenv("FORECAST_PREFETCH", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Region to keep warm as "west,south,east,north"; defaults to the tile
+# coverage, i.e. the OSRM extract
+PREFETCH_BBOX = tuple(
+    float(v) for v in os.getenv("PREFETCH_BBOX", os.getenv("TILE_BBOX", "-80.52,39.72,-74.69,42.27")).split(",")
+)
+
+# Cells per multi-location Open-Meteo request, and the request budget
+PREFETCH_BATCH_SIZE = int(os.getenv("PREFETCH_BATCH_SIZE", "100"))
+PREFETCH_CALLS_PER_MIN = float(os.getenv("PREFETCH_CALLS_PER_MIN", "120"))
+
+# Pause before retrying a pass that left cells unfetched
+PREFETCH_RETRY_S = float(os.getenv("PREFETCH_RETRY_S", "60"))
+
+Cell = Tuple[float, float]
+
+
+def region_cells(bbox: Tuple[float, float, float, float], res: float = FORECAST_GRID_DEG) -> List[Cell]:
+    """Every forecast grid cell overlapping `bbox`, snapped exactly as lookups snap."""
+    west, south, east, north = bbox
+    rows = range(math.floor(south / res), math.ceil(north / res))
+    cols = range(math.floor(west / res), math.ceil(east / res))
+    cells = (snap_to_cell((i + 0.5) * res, (j + 0.5) * res, res) for i in rows for j in cols)
+    return list(dict.fromkeys(cells))
+
+
+class RateLimiter:
+    """Spaces calls evenly at `per_min` per minute (no bursts)."""
+
+    def __init__(self, per_min: float):
+        self.interval = 60.0 / per_min if per_min > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+class Prefetcher:
+    """
+    Each pass asks the store which region cells are missing or expired,
+    fetches just those in rate-limited multi-location batches and upserts
+    them. Passes are scheduled for when Open-Meteo publishes its next run.
+    """
+
+    def __init__(self, bbox, batch_size: int, calls_per_min: float):
+        self.bbox = bbox
+        self.cells = region_cells(bbox)
+        self.batch_size = max(1, batch_size)
+        self.limiter = RateLimiter(calls_per_min)
+        self._task: Optional[asyncio.Task] = None
+
+        self.passes = 0
+        self.calls = 0
+        self.failed_calls = 0
+        self.cells_written = 0
+        self.last_pass_at: Optional[float] = None
+        self.last_pass_s = 0.0
+        self.next_pass_at: Optional[float] = None
+        # False while the last pass left cells unfetched
+        self.complete = True
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="forecast-prefetch")
+
+    async def stop(self) -> None:
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run_once(self) -> dict:
+        """One pass over the region; returns {kind: cells written}."""
+        start = time.time()
+        written = {}
+        failed_before = self.failed_calls
+
+        for kind in _FORECAST_SOURCES:
+            async with AsyncSessionLocal() as db:
+                todo = await stale_cells(db, kind, self.cells)
+
+            written[kind] = 0
+            for i in range(0, len(todo), self.batch_size):
+                chunk = todo[i:i + self.batch_size]
+                # Plain call: hedging would exceed the rate limit, and
+                # prefetch failures must not trip the request-path breakers
+                await self.limiter.wait()
+                try:
+                    series_list = await _request_hourly(kind, chunk)
+                except Exception as e:
+                    self.failed_calls += 1
+                    log.warning("prefetch of %d %s cells failed: %s", len(chunk), kind, e)
+                    continue
+                self.calls += 1
+
+                fetched_at = time.time()
+                async with AsyncSessionLocal() as db:
+                    n = await save_series(db, kind, dict(zip(chunk, series_list)), fetched_at, next_refresh(fetched_at))
+                    await db.commit()
+                written[kind] += n
+                self.cells_written += n
+
+        self.passes += 1
+        self.last_pass_at = time.time()
+        self.last_pass_s = round(self.last_pass_at - start, 2)
+        self.complete = self.failed_calls == failed_before
+        return written
+
+    def _delay(self) -> float:
+        if not self.complete:
+            return PREFETCH_RETRY_S
+        return max(1.0, next_refresh() - time.time())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                written = await self.run_once()
+                log.info("forecast prefetch pass wrote %s in %.1fs", written, self.last_pass_s)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.complete = False
+                log.exception("forecast prefetch pass failed")
+
+            delay = self._delay()
+            self.next_pass_at = time.time() + delay
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": FORECAST_PREFETCH,
+            "running": self.running,
+            "bbox": list(self.bbox),
+            "region_cells": len(self.cells),
+            "passes": self.passes,
+            "calls": self.calls,
+            "failed_calls": self.failed_calls,
+            "cells_written": self.cells_written,
+            "last_pass_at": self.last_pass_at,
+            "last_pass_s": self.last_pass_s,
+            "next_pass_at": self.next_pass_at,
+        }
+
+
+prefetcher = Prefetcher(PREFETCH_BBOX, PREFETCH_BATCH_SIZE, PREFETCH_CALLS_PER_MIN)
+
+
+async def _main(args) -> None:
+    p = prefetcher
+    if args.bbox or args.calls_per_min is not None:
+        bbox = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else PREFETCH_BBOX
+        rate = PREFETCH_CALLS_PER_MIN if args.calls_per_min is None else args.calls_per_min
+        p = Prefetcher(bbox, PREFETCH_BATCH_SIZE, rate)
+
+    print(f"region {p.bbox}: {len(p.cells)} cells per kind")
+    await start_clients()
+    try:
+        if args.once:
+            print("written:", await p.run_once())
+        else:
+            await p._run()
+    finally:
+        await close_clients()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Prefetch forecast series for the routing region.")
+    ap.add_argument("--once", action="store_true", help="run a single pass and exit")
+    ap.add_argument("--bbox", default=None, help="west,south,east,north (default PREFETCH_BBOX)")
+    ap.add_argument("--calls-per-min", type=float, default=None, help="upstream request budget")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    upgrade_schema(engine)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# app/resample.py
+import math
+import os
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+EARTH_RADIUS_M = 6371008.8
+
+# "simplify" keeps the drawn shape (Douglas–Peucker), "spacing" places
+# points every ROUTE_SPACING_M metres along the route. Simplify also fills
+# in points so no two samples are more than ROUTE_SPACING_M apart.
+ROUTE_SAMPLE_MODE = os.getenv("ROUTE_SAMPLE_MODE", "simplify")
+ROUTE_TOLERANCE_M = float(os.getenv("ROUTE_TOLERANCE_M", "15"))
+ROUTE_SPACING_M = float(os.getenv("ROUTE_SPACING_M", "500"))
+ROUTE_MAX_POINTS = int(os.getenv("ROUTE_MAX_POINTS", "200"))
+
+LatLon = Tuple[float, float]
+
+
+# ---- Distance ----
+def cumulative_distance(coords: Sequence[LatLon]) -> List[float]:
+    """Cumulative haversine distance (metres) at every vertex, starting at 0."""
+    n = len(coords)
+    if n == 0:
+        return []
+
+    if np is not None:
+        pts = np.radians(np.asarray(coords, dtype=np.float64))
+        lat, lon = pts[:, 0], pts[:, 1]
+        dlat = np.diff(lat)
+        dlon = np.diff(lon)
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+        step = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        return np.concatenate(([0.0], np.cumsum(step))).tolist()
+
+    out = [0.0]
+    for (lat1, lon1), (lat2, lon2) in zip(coords, coords[1:]):
+        p1, p2 = math.radians(lat1), math.radians(lat2)
+        dp = p2 - p1
+        dl = math.radians(lon2 - lon1)
+        a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+        out.append(out[-1] + 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0))))
+    return out
+
+
+def _cumulative(values: Sequence[float]) -> List[float]:
+    out = [0.0]
+    for v in values:
+        out.append(out[-1] + max(0.0, float(v)))
+    return out
+
+
+# ---- Douglas–Peucker ----
+# Spans shorter than this are scanned in plain Python even with NumPy,
+# where per-call array overhead would dominate.
+_NUMPY_MIN_SPAN = 32
+
+
+def _project(coords: Sequence[LatLon]):
+    """Local equirectangular projection to metres (accurate at route scale)."""
+    lat0 = math.radians(sum(c[0] for c in coords) / len(coords))
+    kx = math.radians(1) * EARTH_RADIUS_M * math.cos(lat0)
+    ky = math.radians(1) * EARTH_RADIUS_M
+    return [c[1] * kx for c in coords], [c[0] * ky for c in coords]
+
+
+def _farthest(xs, ys, first: int, last: int, arrays=None) -> Tuple[int, float]:
+    """Interior vertex farthest from segment first→last, and its distance."""
+    ax, ay = xs[first], ys[first]
+    dx, dy = xs[last] - ax, ys[last] - ay
+    seg2 = dx * dx + dy * dy
+
+    if arrays is not None and last - first > _NUMPY_MIN_SPAN:
+        px = arrays[0][first + 1:last] - ax
+        py = arrays[1][first + 1:last] - ay
+        if seg2 > 0:
+            t = np.clip((px * dx + py * dy) / seg2, 0.0, 1.0)
+            px = px - t * dx
+            py = py - t * dy
+        d2 = px * px + py * py
+        k = int(d2.argmax())
+        return first + 1 + k, math.sqrt(float(d2[k]))
+
+    best, best_d2 = first + 1, -1.0
+    for i in range(first + 1, last):
+        px, py = xs[i] - ax, ys[i] - ay
+        if seg2 > 0:
+            t = max(0.0, min(1.0, (px * dx + py * dy) / seg2))
+            px -= t * dx
+            py -= t * dy
+        d2 = px * px + py * py
+        if d2 > best_d2:
+            best, best_d2 = i, d2
+    return best, math.sqrt(best_d2)
+
+
+def significance(coords: Sequence[LatLon], floor_m: float = 0.0) -> List[float]:
+    """
+    Douglas–Peucker run once: each vertex gets the largest tolerance
+    (metres) at which it would still be kept. Clamping children to their
+    parent's value makes `sig > tol` reproduce DP at any `tol` >= floor_m;
+    spans whose farthest vertex is within `floor_m` are not descended.
+    """
+    n = len(coords)
+    sig = [0.0] * n
+    if n == 0:
+        return sig
+
+    sig[0] = sig[-1] = math.inf
+    if n <= 2:
+        return sig
+
+    xs, ys = _project(coords)
+    arrays = (np.asarray(xs), np.asarray(ys)) if np is not None else None
+    stack = [(0, n - 1, math.inf)]
+
+    while stack:
+        first, last, cap = stack.pop()
+        if last - first < 2:
+            continue
+        i, d = _farthest(xs, ys, first, last, arrays)
+        if d <= floor_m:
+            continue
+        sig[i] = min(d, cap)
+        stack.append((first, i, sig[i]))
+        stack.append((i, last, sig[i]))
+
+    return sig
+
+
+def _gap_points(cum_d: Optional[Sequence[float]], spacing_m: float, a: int, b: int) -> int:
+    """Samples the span a→b adds (its end plus fillers) at `spacing_m`; 1 without spacing."""
+    if not spacing_m or cum_d is None:
+        return 1
+    return max(1, math.ceil((cum_d[b] - cum_d[a]) / spacing_m - 1e-9))
+
+
+def simplify_indices(
+    coords: Sequence[LatLon],
+    tolerance_m: float,
+    max_points: int = 0,
+    cum_d: Optional[Sequence[float]] = None,
+    spacing_m: float = 0.0,
+) -> List[int]:
+    """
+    Vertex indices kept by Douglas–Peucker at `tolerance_m`; with
+    `max_points`, the most significant vertices are kept if more survive.
+    With `spacing_m` (and `cum_d`), the filler points needed to close gaps
+    longer than `spacing_m` count toward `max_points` too.
+    """
+    sig = significance(coords, tolerance_m)
+    keep = [i for i, v in enumerate(sig) if v > tolerance_m or math.isinf(v)]
+    if not max_points or len(keep) <= 2:
+        return keep
+
+    def cost(idx):
+        return 1 + sum(_gap_points(cum_d, spacing_m, a, b) for a, b in zip(idx, idx[1:]))
+
+    if cost(keep) <= max_points:
+        return keep
+
+    # Add vertices most significant first; each one splits a gap, which
+    # never lowers the count, so skip those that would exceed the budget
+    chosen = [keep[0], keep[-1]]
+    total = cost(chosen)
+    for i in sorted(keep[1:-1], key=lambda i: sig[i], reverse=True):
+        pos = bisect_left(chosen, i)
+        a, b = chosen[pos - 1], chosen[pos]
+        delta = (_gap_points(cum_d, spacing_m, a, i) + _gap_points(cum_d, spacing_m, i, b)
+                 - _gap_points(cum_d, spacing_m, a, b))
+        if total + delta > max_points:
+            continue
+        chosen.insert(pos, i)
+        total += delta
+    return chosen
+
+
+# ---- Fixed spacing ----
+def _interp(targets: Sequence[float], xp: Sequence[float], fp: Sequence[float]) -> List[float]:
+    if np is not None:
+        return np.interp(targets, xp, fp).tolist()
+
+    out = []
+    last = len(xp) - 1
+    for t in targets:
+        j = min(max(bisect_right(xp, t) - 1, 0), last - 1) if last > 0 else 0
+        x0, x1 = xp[j], xp[min(j + 1, last)]
+        w = 0.0 if x1 == x0 else (t - x0) / (x1 - x0)
+        w = max(0.0, min(1.0, w))
+        out.append(fp[j] + (fp[min(j + 1, last)] - fp[j]) * w)
+    return out
+
+
+# ---- Public entry point ----
+def resample_route(
+    coords: Sequence[LatLon],
+    seg_durations: Optional[Sequence[float]] = None,
+    mode: str = ROUTE_SAMPLE_MODE,
+    tolerance_m: float = ROUTE_TOLERANCE_M,
+    spacing_m: float = ROUTE_SPACING_M,
+    max_points: int = ROUTE_MAX_POINTS,
+) -> List[Tuple[float, float, float]]:
+    """
+    Resample a decoded (lat, lon) polyline into at most `max_points`
+    (lat, lon, frac) tuples, where `frac` is the share of travel time
+    elapsed at that point.
+
+    `seg_durations` are OSRM's per-edge durations (len(coords) - 1); when
+    absent or mismatched, time is assumed proportional to distance.
+    """
+    n = len(coords)
+    if n == 0:
+        return []
+    if n == 1:
+        return [(coords[0][0], coords[0][1], 0.0)]
+
+    max_points = max(2, max_points)
+    cum_d = cumulative_distance(coords)
+
+    if seg_durations is not None and len(seg_durations) == n - 1 and sum(seg_durations) > 0:
+        cum_t = _cumulative(seg_durations)
+    else:
+        cum_t = cum_d
+
+    total_d = cum_d[-1]
+    total_t = cum_t[-1] or 1.0
+
+    if mode == "spacing" and total_d > 0:
+        spacing = max(spacing_m, total_d / (max_points - 1))
+        count = int(total_d // spacing)
+        targets = [i * spacing for i in range(count + 1)]
+        if total_d - targets[-1] > 1e-6:
+            targets.append(total_d)
+
+        lats = _interp(targets, cum_d, [c[0] for c in coords])
+        lons = _interp(targets, cum_d, [c[1] for c in coords])
+        times = _interp(targets, cum_d, cum_t)
+        return [(la, lo, t / total_t) for la, lo, t in zip(lats, lons, times)]
+
+    # Long straight legs keep only their ends under Douglas–Peucker, so
+    # fill each gap with evenly spaced points (at most max_points overall)
+    spacing = max(spacing_m, total_d / (max_points - 1)) if total_d > 0 else 0.0
+    idx = simplify_indices(coords, tolerance_m, max_points, cum_d, spacing)
+
+    targets = []
+    for a, b in zip(idx, idx[1:]):
+        pieces = _gap_points(cum_d, spacing, a, b)
+        step = (cum_d[b] - cum_d[a]) / pieces
+        targets.extend(cum_d[a] + k * step for k in range(1, pieces))
+    if not targets:
+        return [(coords[i][0], coords[i][1], cum_t[i] / total_t) for i in idx]
+
+    lats = iter(_interp(targets, cum_d, [c[0] for c in coords]))
+    lons = iter(_interp(targets, cum_d, [c[1] for c in coords]))
+    times = iter(_interp(targets, cum_d, cum_t))
+
+    out = []
+    for a, b in zip(idx, idx[1:]):
+        out.append((coords[a][0], coords[a][1], cum_t[a] / total_t))
+        for _ in range(_gap_points(cum_d, spacing, a, b) - 1):
+            out.append((next(lats), next(lons), next(times) / total_t))
+    last = idx[-1]
+    out.append((coords[last][0], coords[last][1], cum_t[last] / total_t))
+    return out
@@ -0,0 +1,334 @@
+# app/route_service.py
+import asyncio
+import datetime as dt
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from .hori import (
+    enrich_segments_with_eta,
+    enrich_segments_stream,
+    prefetch_corridors,
+    parse_iso,
+    sweep_departures,
+    weather_budget,
+)
+from .models import (
+    RouteRequest,
+    DepartureSweepRequest,
+    DepartureSlot,
+    DepartureSweepResponse,
+    HoriSummary,
+    HoriRouteAlternative,
+    HoriRouteResponse,
+)
+from .osrm import get_osrm_route, get_osrm_routes
+from .database import AsyncSessionLocal
+from .persistence import persist_trip
+from .trip_codec import SegmentColumns, segment_columns
+
+log = logging.getLogger(__name__)
+
+# Routes of one batch request planned at the same time
+ROUTE_BATCH_CONCURRENCY = int(os.getenv("ROUTE_BATCH_CONCURRENCY", "8"))
+
+
+@dataclass
+class ScoredRoute:
+    segments: SegmentColumns
+    summary: HoriSummary
+    distance_km: float
+    duration_min: float
+    depart: dt.datetime
+    arrive: dt.datetime
+    rank_score: Optional[float] = None
+
+
+def _iso_z(d: dt.datetime) -> str:
+    return d.isoformat().replace("+00:00", "Z")
+
+
+def request_departure(req: RouteRequest) -> dt.datetime:
+    if req.depart_iso:
+        return parse_iso(req.depart_iso)
+    return dt.datetime.now(dt.timezone.utc)
+
+
+def rank_routes(routes: List[ScoredRoute], duration_weight: float) -> List[ScoredRoute]:
+    """
+    Order candidates by a blend of duration and HORI exposure, each taken
+    relative to the best candidate (1.0 = as good as the best). Exposure is
+    +1-smoothed so a zero-exposure route does not make the ratio explode.
+    """
+    if len(routes) < 2:
+        return routes
+
+    best_dur = min(r.duration_min for r in routes) or 1.0
+    best_exp = min(r.summary.exposure_min for r in routes)
+
+    for r in routes:
+        dur_ratio = r.duration_min / best_dur
+        exp_ratio = (r.summary.exposure_min + 1.0) / (best_exp + 1.0)
+        r.rank_score = round(duration_weight * dur_ratio + (1 - duration_weight) * exp_ratio, 4)
+
+    return sorted(routes, key=lambda r: r.rank_score)
+
+
+async def plan_route(req: RouteRequest, depart: Optional[dt.datetime] = None) -> List[ScoredRoute]:
+    """
+    Fetch the route (plus alternatives if requested), score every
+    candidate concurrently and return them best first.
+    """
+    depart = depart or request_departure(req)
+
+    candidates = await get_osrm_routes(req.src, req.dst, req.stops, req.alternatives)
+
+    # Prefetch and enrichment wait out one weather budget between them
+    with weather_budget():
+        # One shared weather fetch for the union of all candidate corridors
+        if len(candidates) > 1:
+            await prefetch_corridors([points for points, _, _ in candidates])
+
+        enriched = await asyncio.gather(*(
+            enrich_segments_with_eta(points, depart, duration_min)
+            for points, _, duration_min in candidates
+        ))
+
+    routes = [
+        ScoredRoute(
+            segments=segments,
+            summary=summary,
+            distance_km=distance_km,
+            duration_min=duration_min,
+            depart=depart,
+            arrive=arrive,
+        )
+        for (_, distance_km, duration_min), (segments, summary, arrive)
+        in zip(candidates, enriched)
+    ]
+    return rank_routes(routes, req.duration_weight)
+
+
+def trip_values(req: RouteRequest, route: ScoredRoute) -> dict:
+    """Column values for the `trips` row of a scored route."""
+    summary = route.summary
+    return dict(
+        src_lon=req.src[0],
+        src_lat=req.src[1],
+        dst_lon=req.dst[0],
+        dst_lat=req.dst[1],
+        distance_km=route.distance_km,
+        duration_min=route.duration_min,
+        depart_iso=_iso_z(route.depart),
+        arrive_iso=_iso_z(route.arrive),
+        avg_hori=summary.avg_hori,
+        worst_hori=summary.worst_hori,
+        worst_idx=summary.worst_idx,
+        max_aqi=summary.max_aqi,
+        avg_temp_c=summary.avg_temp_c,
+        degraded=summary.degraded,
+        stale_age_s=summary.stale_age_s,
+        src_name=req.src_name,
+        dst_name=req.dst_name,
+        stop_names=json.dumps(req.stop_names or []),
+    )
+
+
+def route_response(routes: List[ScoredRoute], trip_id: Optional[int]) -> HoriRouteResponse:
+    best, others = routes[0], routes[1:]
+
+    alternatives = None
+    if best.rank_score is not None:
+        alternatives = [
+            HoriRouteAlternative(
+                segments=r.segments.models(),
+                summary=r.summary,
+                distance_km=r.distance_km,
+                duration_min=r.duration_min,
+                arrive_iso=_iso_z(r.arrive),
+                rank_score=r.rank_score,
+            )
+            for r in others
+        ]
+
+    return HoriRouteResponse(
+        segments=best.segments.models(),
+        summary=best.summary,
+        distance_km=best.distance_km,
+        duration_min=best.duration_min,
+        depart_iso=_iso_z(best.depart),
+        arrive_iso=_iso_z(best.arrive),
+        trip_id=trip_id,
+        rank_score=best.rank_score,
+        alternatives=alternatives,
+    )
+
+
+def route_columnar(routes: List[ScoredRoute], trip_id: Optional[int]) -> dict:
+    """
+    `format=columnar` counterpart of route_response: the same fields, with
+    segments as parallel arrays straight from the scoring output (see
+    trip_codec.segment_columns), no per-segment models, ready for a fast
+    JSON encoder.
+    """
+    def doc(r: ScoredRoute) -> dict:
+        return {
+            **segment_columns(r.segments),
+            "summary": r.summary.model_dump(),
+            "distance_km": r.distance_km,
+            "duration_min": r.duration_min,
+            "arrive_iso": _iso_z(r.arrive),
+            "rank_score": r.rank_score,
+        }
+
+    best, others = routes[0], routes[1:]
+    out = doc(best)
+    out.update(
+        format="columnar",
+        depart_iso=_iso_z(best.depart),
+        trip_id=trip_id,
+        alternatives=[doc(r) for r in others] if best.rank_score is not None else None,
+    )
+    return out
+
+
+# ---- Streaming ----
+def _ndjson(doc: dict) -> str:
+    return json.dumps(doc, separators=(",", ":")) + "\n"
+
+
+async def stream_route(req: RouteRequest, persist: bool = True) -> AsyncIterator[str]:
+    """
+    NDJSON events for one route, each sent as soon as it is known:
+      {"event": "route", geometry/distance/duration/times}  after OSRM
+      {"event": "segments", "offset", "segments"}           per weather block
+      {"event": "summary", "summary", "trip_id"}            after persistence
+    A failure ends the stream with {"event": "error", "detail"}.
+    Alternatives are not scored in streaming mode.
+    """
+    try:
+        depart = request_departure(req)
+        points, distance_km, duration_min = await get_osrm_route(req.src, req.dst, req.stops)
+
+        yield _ndjson({
+            "event": "route",
+            "distance_km": distance_km,
+            "duration_min": duration_min,
+            "depart_iso": _iso_z(depart),
+            "arrive_iso": _iso_z(depart + dt.timedelta(minutes=duration_min)),
+            "geometry": [[p.lon, p.lat] for p in points],
+        })
+
+        blocks = {}
+        async for event in enrich_segments_stream(points, depart, duration_min):
+            if event[0] == "segments":
+                _, offset, block = event
+                blocks[offset] = block
+                yield _ndjson({
+                    "event": "segments",
+                    "offset": offset,
+                    "segments": [s.model_dump() for s in block.models()],
+                })
+            else:
+                _, summary, arrive = event
+
+        route = ScoredRoute(
+            segments=SegmentColumns.concat([blocks[k] for k in sorted(blocks)]),
+            summary=summary,
+            distance_km=distance_km,
+            duration_min=duration_min,
+            depart=depart,
+            arrive=arrive,
+        )
+
+        trip_id = None
+        if persist:
+            async with AsyncSessionLocal() as db:
+                trip_id = await persist_trip(db, trip_values(req, route), route.segments)
+
+        yield _ndjson({"event": "summary", "summary": summary.model_dump(), "trip_id": trip_id})
+    except Exception as e:
+        log.warning("streamed route failed: %r", e)
+        yield _ndjson({"event": "error", "detail": f"{type(e).__name__}: {e}"})
+
+
+# ---- Departure sweep ----
+async def sweep_route(req: DepartureSweepRequest) -> DepartureSweepResponse:
+    """Score one OSRM route for every departure in the request's window."""
+    start = request_departure(req)
+    points, distance_km, duration_min = await get_osrm_route(req.src, req.dst, req.stops)
+
+    step = dt.timedelta(minutes=req.step_min)
+    departs = [start + i * step for i in range(req.window_min // req.step_min + 1)]
+
+    res, degraded, ages = await sweep_departures(points, [d.timestamp() for d in departs], duration_min)
+
+    travel = dt.timedelta(minutes=duration_min)
+    slots = [
+        DepartureSlot(
+            depart_iso=_iso_z(d),
+            arrive_iso=_iso_z(d + travel),
+            avg_hori=res.avg_hori[i],
+            worst_hori=res.worst_hori[i],
+            max_aqi=res.max_aqi[i],
+            avg_temp_c=res.avg_temp_c[i],
+            exposure_min=res.exposure[i],
+            degraded=degraded[i],
+            stale_age_s=ages[i],
+        )
+        for i, d in enumerate(departs)
+    ]
+    best = min(range(len(slots)), key=lambda i: (slots[i].exposure_min, i))
+
+    return DepartureSweepResponse(
+        distance_km=distance_km,
+        duration_min=duration_min,
+        slots=slots,
+        best=slots[best],
+    )
+
+
+# ---- Batch ----
+async def _run_batch_item(index: int, req: RouteRequest, persist: bool, sem: asyncio.Semaphore) -> str:
+    """One NDJSON line for one batch item; failures are reported, not raised."""
+    async with sem:
+        try:
+            routes = await plan_route(req)
+            best = routes[0]
+
+            trip_id = None
+            if persist:
+                # Own session per item: a session is not safe for concurrent use
+                async with AsyncSessionLocal() as db:
+                    trip_id = await persist_trip(db, trip_values(req, best), best.segments)
+
+            body = route_response(routes, trip_id).model_dump_json()
+            return f'{{"index":{index},"ok":true,"result":{body}}}\n'
+        except Exception as e:
+            log.warning("batch item %d failed: %r", index, e)
+            error = {"index": index, "ok": False, "error": f"{type(e).__name__}: {e}"}
+            return json.dumps(error, separators=(",", ":")) + "\n"
+
+
+async def plan_batch(reqs: List[RouteRequest], persist: bool = True,
+                     concurrency: int = ROUTE_BATCH_CONCURRENCY) -> AsyncIterator[str]:
+    """
+    Plan many routes with at most `concurrency` in flight and yield one
+    NDJSON line per request as each completes (not in request order).
+    Identical routes and overlapping weather cells are fetched once across
+    the batch through the OSRM single-flight and the forecast in-flight map.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        asyncio.create_task(_run_batch_item(i, req, persist, sem))
+        for i, req in enumerate(reqs)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop the remaining work
+        for t in tasks:
+            t.cancel()
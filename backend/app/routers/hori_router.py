@@ -1,13 +1,35 @@
 # app/routers/hori_router.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 import datetime as dt
 import json
+from typing import List, Literal, Optional
 
-from app.database import SessionLocal
+from app.database import get_db
 from app import hori
-from app.models import RouteRequest, HoriRouteResponse
-from app.db_models import SearchedPoint, Trip, Segment as TripSegment
+from app.models import (
+    RouteRequest,
+    RouteBatchRequest,
+    HoriRouteResponse,
+    DepartureSweepRequest,
+    DepartureSweepResponse,
+    PointsRequest,
+    HoriPointsResponse,
+    SearchedPointOut,
+)
+from app.db_models import SearchedPoint
+from app.persistence import persist_trip, persist_point, persist_points
+from app.pagination import PAGE_MAX_LIMIT, PageError, keyset_page, page_response, select_fields
+from app.route_service import (
+    plan_route,
+    plan_batch,
+    stream_route,
+    sweep_route,
+    trip_values,
+    route_response,
+    route_columnar,
+)
 
 
 def now_utc():
@@ -17,14 +39,6 @@ def now_utc():
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ---------------------------------------------------------
 # Helper: Convert stored JSON text "[]" → python list []
 # ---------------------------------------------------------
@@ -42,18 +56,18 @@ def parse_stop_names(raw):
 # ----------------------------------------
 @router.get("/hori")
 async def hori_point(lat: float, lon: float):
-    now = now_utc()
-    temp = await hori._fetch_temp_once(lat, lon, now)
-    aqi = await hori._fetch_aqi_once(lat, lon, now)
-    hori_score, reason = hori._compute_hori(temp, aqi)
+    w = await hori.point_weather(lat, lon, now_utc())
+    hori_score, reason = hori._compute_hori(w.temp_c, w.aqi)
 
     return {
         "lat": lat,
         "lon": lon,
-        "temp_c": temp,
-        "aqi": aqi,
+        "temp_c": w.temp_c,
+        "aqi": w.aqi,
         "hori": hori_score,
         "reason": reason,
+        "degraded": w.degraded,
+        "stale_age_s": w.stale_age_s,
     }
 
 
@@ -61,39 +75,91 @@ async def hori_point(lat: float, lon: float):
 # SAVE HORI POINT
 # ----------------------------------------
 @router.post("/hori/point")
-async def save_hori_point(lat: float, lon: float, place_name: str, db: Session = Depends(get_db)):
-    now = now_utc()
-
-    temp = await hori._fetch_temp_once(lat, lon, now)
-    aqi = await hori._fetch_aqi_once(lat, lon, now)
-    hori_score, reason = hori._compute_hori(temp, aqi)
+async def save_hori_point(lat: float, lon: float, place_name: str, db: AsyncSession = Depends(get_db)):
+    w = await hori.point_weather(lat, lon, now_utc())
+    hori_score, reason = hori._compute_hori(w.temp_c, w.aqi)
 
-    row = SearchedPoint(
+    values = dict(
         place_name=place_name,
         lat=lat,
         lon=lon,
-        temp_c=temp,
-        aqi=aqi,
+        temp_c=w.temp_c,
+        aqi=w.aqi,
         hori=hori_score,
         reason=reason,
+        degraded=w.degraded,
+        stale_age_s=w.stale_age_s,
+    )
+    return await persist_point(db, values)
+
+
+# ----------------------------------------
+# BULK HORI POINTS (columnar)
+# ----------------------------------------
+@router.post("/hori/points", response_model=HoriPointsResponse)
+async def hori_points(req: PointsRequest, db: AsyncSession = Depends(get_db)):
+    lons = [p[0] for p in req.points]
+    lats = [p[1] for p in req.points]
+
+    if req.ts:
+        times = [hori.parse_iso(t) for t in req.ts]
+    else:
+        times = [now_utc()] * len(req.points)
+
+    temps, aqis, res, degraded, ages = await hori.score_points(lats, lons, [t.timestamp() for t in times])
+    reasons = res.reasons
+
+    ids = None
+    if req.persist:
+        names = req.place_names or [None] * len(req.points)
+        rows = [
+            dict(place_name=name, lat=lat, lon=lon, temp_c=temp, aqi=aqi, hori=score, reason=reason,
+                 degraded=bad, stale_age_s=age)
+            for name, lat, lon, temp, aqi, score, reason, bad, age
+            in zip(names, lats, lons, temps, aqis, res.scores, reasons, degraded, ages)
+        ]
+        ids = await persist_points(db, rows)
+
+    return HoriPointsResponse(
+        count=len(req.points),
+        lon=lons,
+        lat=lats,
+        ts=[hori._iso(t) for t in times],
+        temp_c=temps,
+        aqi=aqis,
+        hori=res.scores,
+        reason=reasons,
+        degraded=degraded,
+        stale_age_s=ages,
+        ids=ids,
     )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-    return row
 
 
 # ----------------------------------------
 # LIST SEARCHED POINTS
 # ----------------------------------------
-@router.get("/searched")
-def list_searched(db: Session = Depends(get_db)):
-    return db.query(SearchedPoint).order_by(SearchedPoint.id.desc()).all()
+@router.get("/searched", response_model=List[SearchedPointOut])
+async def list_searched(
+    limit: int = Query(50, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    since: Optional[dt.datetime] = None,
+    until: Optional[dt.datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Keyset pages, newest first; next page cursor in X-Next-Cursor
+    try:
+        columns = select_fields(SearchedPointOut.model_fields, fields)
+        rows, next_cursor = await keyset_page(db, SearchedPoint, columns, limit, cursor, since, until)
+    except PageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return page_response(rows, next_cursor)
 
 
 @router.get("/searched/{point_id}")
-def get_searched(point_id: int, db: Session = Depends(get_db)):
-    row = db.query(SearchedPoint).filter(SearchedPoint.id == point_id).first()
+async def get_searched(point_id: int, db: AsyncSession = Depends(get_db)):
+    row = await db.get(SearchedPoint, point_id)
     if not row:
         raise HTTPException(status_code=404, detail="Not found")
     return row
@@ -103,74 +169,50 @@ def get_searched(point_id: int, db: Session = Depends(get_db)):
 # HORI ROUTE (OSRM)
 # ----------------------------------------
 @router.post("/hori/route", response_model=HoriRouteResponse)
-async def hori_route(req: RouteRequest, db: Session = Depends(get_db)):
-    from app.osrm import get_osrm_route
+async def hori_route(
+    req: RouteRequest,
+    format: Literal["json", "columnar"] = "json",
+    db: AsyncSession = Depends(get_db),
+):
+    # Route (+ alternatives), per-segment weather and HORI, best first
+    routes = await plan_route(req)
+    best = routes[0]
 
-    pts, distance_km, duration_min = await get_osrm_route(req.src, req.dst, req.stops)
+    # Trip + segments in a single bulk transaction (or queued, write-behind)
+    trip_id = await persist_trip(db, trip_values(req, best), best.segments)
 
-    depart = (
-        dt.datetime.fromisoformat(req.depart_iso.replace("Z", "+00:00"))
-        if req.depart_iso else now_utc()
-    )
+    if format == "columnar":
+        # Parallel arrays, no per-segment validation, orjson-encoded
+        return ORJSONResponse(route_columnar(routes, trip_id))
 
-    enriched, summary, arrive = await hori.enrich_segments_with_eta(
-        pts, depart, duration_min
-    )
+    return route_response(routes, trip_id)
+
+
+# ----------------------------------------
+# HORI ROUTE, STREAMED (NDJSON events)
+# ----------------------------------------
+@router.post("/hori/route/stream")
+async def hori_route_stream(req: RouteRequest):
+    # route geometry first, then segment batches, then summary + trip_id
+    return StreamingResponse(stream_route(req), media_type="application/x-ndjson")
 
-    # ----------------------------------------
-    # SAVE TRIP WITH NEW FIELDS
-    # ----------------------------------------
-    trip = Trip(
-        src_lon=req.src[0],
-        src_lat=req.src[1],
-        dst_lon=req.dst[0],
-        dst_lat=req.dst[1],
-        distance_km=distance_km,
-        duration_min=duration_min,
-        depart_iso=depart.isoformat().replace("+00:00", "Z"),
-        arrive_iso=arrive.isoformat().replace("+00:00", "Z"),
-        avg_hori=summary.avg_hori,
-        worst_hori=summary.worst_hori,
-        worst_idx=summary.worst_idx,
-        max_aqi=summary.max_aqi,
-        avg_temp_c=summary.avg_temp_c,
-
-        # NEW
-        src_name=req.src_name,
-        dst_name=req.dst_name,
-        stop_names=json.dumps(req.stop_names or []),
-    )
 
-    db.add(trip)
-    db.commit()
-    db.refresh(trip)
-
-    # Save segments as usual
-    for i, s in enumerate(enriched):
-        db.add(
-            TripSegment(
-                trip_id=trip.id,
-                idx=i,
-                lon=s.lon,
-                lat=s.lat,
-                ts=s.ts,
-                temp_c=s.temp_c,
-                aqi=s.aqi,
-                hori=s.hori,
-                reason=s.reason,
-            )
-        )
-    db.commit()
-
-    # ------------------------------
-    # RETURN RESPONSE
-    # ------------------------------
-    # No change needed here
-    return HoriRouteResponse(
-        segments=enriched,
-        summary=summary,
-        distance_km=distance_km,
-        duration_min=duration_min,
-        depart_iso=trip.depart_iso,
-        arrive_iso=trip.arrive_iso,
+# ----------------------------------------
+# BEST DEPARTURE TIME (window sweep)
+# ----------------------------------------
+@router.post("/hori/route/departures", response_model=DepartureSweepResponse)
+async def hori_route_departures(req: DepartureSweepRequest):
+    # One route + one forecast fetch, scored for every candidate departure
+    return await sweep_route(req)
+
+
+# ----------------------------------------
+# BATCH HORI ROUTES (NDJSON stream)
+# ----------------------------------------
+@router.post("/hori/routes/batch")
+async def hori_routes_batch(req: RouteBatchRequest):
+    # One line per route as it finishes: {"index", "ok", "result" | "error"}
+    return StreamingResponse(
+        plan_batch(req.routes, persist=req.persist),
+        media_type="application/x-ndjson",
     )
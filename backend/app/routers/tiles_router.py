@@ -0,0 +1,39 @@
+# app/routers/tiles_router.py
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app import hori
+from app.tiles import get_tile, tile_cache, tile_flight, TileOutOfRange
+from app.trip_cache import etag_matches
+
+
+router = APIRouter()
+
+
+# ----------------------------------------
+# HORI HEATMAP TILES
+# ----------------------------------------
+@router.get("/tiles/hori/{z}/{x}/{y}")
+async def hori_tile(z: int, x: int, y: int, request: Request, hour: Optional[str] = None):
+    # `hour` = ISO time (floored to the hour); default is the current hour
+    at = int(hori.parse_iso(hour).timestamp()) if hour else None
+
+    try:
+        tile = await get_tile(z, x, y, at)
+    except TileOutOfRange as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    headers = {
+        "ETag": tile.etag,
+        "Cache-Control": f"public, max-age={tile.max_age()}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), tile.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=tile.body, media_type="application/json", headers=headers)
+
+
+@router.get("/tiles/stats")
+def tile_stats():
+    return {**tile_cache.stats(), **tile_flight.stats()}
@@ -0,0 +1,219 @@
+# app/scoring.py
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+
+# Reason codes, in tie-break order after "ok"
+REASONS = ("ok", "air_quality", "heat", "cold")
+REASON_CODES = {name: code for code, name in enumerate(REASONS)}
+
+# ---- HORI model constants ----
+AQI_CAP = 500
+AQI_WEIGHT = 0.12
+HEAT_THRESHOLD_C = 25.0
+HEAT_WEIGHT = 1.2
+COLD_THRESHOLD_C = 5.0
+COLD_WEIGHT = 2.0
+REASON_MIN_PENALTY = 1.0
+
+# Below this size the NumPy call overhead outweighs the vector speed-up
+_NUMPY_MIN_BATCH = 32
+
+
+@dataclass
+class BatchScore:
+    scores: List[int]
+    reason_codes: List[int]
+
+    avg_hori: float
+    worst_hori: int
+    worst_idx: int
+    max_aqi: int
+    avg_temp_c: float
+    exposure: float
+
+    @property
+    def reasons(self) -> List[str]:
+        return [REASONS[c] for c in self.reason_codes]
+
+
+def segment_weights(fracs: Sequence[float], total_min: float) -> List[float]:
+    """
+    Minutes of travel attributed to each route point: half the gap to each
+    neighbour, so the weights sum to the trip duration.
+    """
+    n = len(fracs)
+    if n == 0:
+        return []
+    if n == 1:
+        return [total_min]
+
+    out = []
+    for i in range(n):
+        lo = fracs[i - 1] if i > 0 else fracs[0]
+        hi = fracs[i + 1] if i < n - 1 else fracs[-1]
+        out.append((hi - lo) / 2 * total_min)
+    return out
+
+
+def score_batch(
+    temps: Sequence[float],
+    aqis: Sequence[float],
+    weights: Optional[Sequence[float]] = None,
+) -> BatchScore:
+    """
+    Score many (temperature, AQI) pairs and aggregate them in one pass.
+
+    `weights` are per-item durations (minutes); `exposure` is the weighted
+    sum of (1 - hori/100), i.e. minutes spent at full risk. Without weights
+    every item counts as one minute.
+    """
+    n = len(temps)
+    if n != len(aqis) or (weights is not None and len(weights) != n):
+        raise ValueError("temps, aqis and weights must have the same length")
+
+    if n == 0:
+        return BatchScore([], [], 0.0, 0, 0, 0, 0.0, 0.0)
+
+    if np is not None and n >= _NUMPY_MIN_BATCH:
+        return _score_numpy(temps, aqis, weights)
+    return _score_python(temps, aqis, weights)
+
+
+def _penalties_numpy(t, a):
+    """(aqi, heat, cold) penalties stacked on a new leading axis."""
+    penalties = np.empty((3,) + t.shape)
+    penalties[0] = AQI_WEIGHT * np.minimum(a, AQI_CAP)
+    penalties[1] = np.maximum(0.0, t - HEAT_THRESHOLD_C) * HEAT_WEIGHT
+    penalties[2] = np.maximum(0.0, COLD_THRESHOLD_C - t) * COLD_WEIGHT
+    return penalties
+
+
+def _score_numpy(temps, aqis, weights) -> BatchScore:
+    t = np.asarray(temps, dtype=np.float64)
+    a = np.asarray(aqis, dtype=np.float64)
+
+    penalties = _penalties_numpy(t, a)
+    scores = np.rint(np.clip(100.0 - penalties.sum(axis=0), 0.0, 100.0)).astype(np.int64)
+
+    # argmax keeps the first maximum, matching the air_quality > heat > cold order
+    dominant = penalties.argmax(axis=0)
+    codes = np.where(penalties.max(axis=0) < REASON_MIN_PENALTY, 0, dominant + 1)
+
+    w = np.ones(len(t)) if weights is None else np.asarray(weights, dtype=np.float64)
+    worst_idx = int(scores.argmin())
+
+    return BatchScore(
+        scores=scores.tolist(),
+        reason_codes=codes.tolist(),
+        avg_hori=float(scores.mean()),
+        worst_hori=int(scores[worst_idx]),
+        worst_idx=worst_idx,
+        max_aqi=int(a.max()),
+        avg_temp_c=float(t.mean()),
+        exposure=float(((100 - scores) / 100.0 * w).sum()),
+    )
+
+
+def _score_python(temps, aqis, weights) -> BatchScore:
+    scores = []
+    codes = []
+    exposure = 0.0
+    worst_idx = 0
+
+    for i, (temp, aqi) in enumerate(zip(temps, aqis)):
+        aqi_pen = AQI_WEIGHT * min(aqi, AQI_CAP)
+        heat = max(0.0, temp - HEAT_THRESHOLD_C) * HEAT_WEIGHT
+        cold = max(0.0, COLD_THRESHOLD_C - temp) * COLD_WEIGHT
+
+        score = int(round(max(0.0, min(100.0, 100.0 - (aqi_pen + heat + cold)))))
+
+        code, top = 1, aqi_pen
+        if heat > top:
+            code, top = 2, heat
+        if cold > top:
+            code, top = 3, cold
+        if top < REASON_MIN_PENALTY:
+            code = 0
+
+        scores.append(score)
+        codes.append(code)
+
+        exposure += (100 - score) / 100.0 * (1.0 if weights is None else weights[i])
+        if score < scores[worst_idx]:
+            worst_idx = i
+
+    n = len(scores)
+    return BatchScore(
+        scores=scores,
+        reason_codes=codes,
+        avg_hori=sum(scores) / n,
+        worst_hori=scores[worst_idx],
+        worst_idx=worst_idx,
+        max_aqi=int(max(aqis)),
+        avg_temp_c=float(sum(temps)) / n,
+        exposure=exposure,
+    )
+
+
+@dataclass
+class SweepScore:
+    """Per-row aggregates of score_sweep; entry i belongs to row i."""
+    avg_hori: List[float]
+    worst_hori: List[int]
+    max_aqi: List[int]
+    avg_temp_c: List[float]
+    exposure: List[float]
+
+
+def score_sweep(
+    temps: Sequence[Sequence[float]],
+    aqis: Sequence[Sequence[float]],
+    weights: Optional[Sequence[float]] = None,
+) -> SweepScore:
+    """
+    Score the same route under many scenarios at once (one row per
+    departure time, one column per point) and aggregate each row like
+    score_batch. `weights` are per-column and shared by every row.
+    """
+    rows = len(temps)
+    if rows == 0:
+        return SweepScore([], [], [], [], [])
+
+    if np is None or rows * len(temps[0]) < _NUMPY_MIN_BATCH:
+        results = [score_batch(t, a, weights) for t, a in zip(temps, aqis)]
+        return SweepScore(
+            avg_hori=[r.avg_hori for r in results],
+            worst_hori=[r.worst_hori for r in results],
+            max_aqi=[r.max_aqi for r in results],
+            avg_temp_c=[r.avg_temp_c for r in results],
+            exposure=[r.exposure for r in results],
+        )
+
+    t = np.asarray(temps, dtype=np.float64)
+    a = np.asarray(aqis, dtype=np.float64)
+    if t.shape != a.shape or (weights is not None and len(weights) != t.shape[1]):
+        raise ValueError("temps, aqis and weights must have matching shapes")
+
+    penalties = _penalties_numpy(t, a)
+    scores = np.rint(np.clip(100.0 - penalties.sum(axis=0), 0.0, 100.0))
+    w = np.ones(t.shape[1]) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    return SweepScore(
+        avg_hori=scores.mean(axis=1).tolist(),
+        worst_hori=scores.min(axis=1).astype(np.int64).tolist(),
+        max_aqi=a.max(axis=1).astype(np.int64).tolist(),
+        avg_temp_c=t.mean(axis=1).tolist(),
+        exposure=((100 - scores) / 100.0 @ w).tolist(),
+    )
+
+
+def score_point(temp_c: float, aqi: float):
+    """Single-point wrapper over score_batch: returns (hori, reason)."""
+    res = score_batch([temp_c], [aqi])
+    return res.scores[0], REASONS[res.reason_codes[0]]
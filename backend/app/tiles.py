@@ -0,0 +1,188 @@
+# app/tiles.py
+import asyncio
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .forecast_cache import FORECAST_CADENCE_S, next_refresh
+from .hori import score_points
+from .utils.singleflight import SingleFlight
+from .utils.ttl_cache import TTLCache
+
+# Coverage of the OSRM extract as "west,south,east,north" (default: Pennsylvania)
+TILE_BBOX = tuple(float(v) for v in os.getenv("TILE_BBOX", "-80.52,39.72,-74.69,42.27").split(","))
+
+# HORI samples per tile side, and the zoom levels served
+TILE_GRID = int(os.getenv("TILE_GRID", "16"))
+TILE_MIN_ZOOM = int(os.getenv("TILE_MIN_ZOOM", "5"))
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", "14"))
+
+# Rendered tiles kept in memory, and on disk under TILE_CACHE_DIR ("" = off)
+TILE_CACHE_MAX_ENTRIES = int(os.getenv("TILE_CACHE_MAX_ENTRIES", "2000"))
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "/tmp/hori-tiles")
+
+# Tiles drawn from stale or fallback weather are kept this long in memory
+# only, so they are redrawn once the forecast is back
+TILE_DEGRADED_TTL_S = float(os.getenv("TILE_DEGRADED_TTL_S", "60"))
+
+# (z, x, y, hour epoch) -> Tile
+tile_cache = TTLCache(max_entries=TILE_CACHE_MAX_ENTRIES)
+tile_flight = SingleFlight()
+
+
+class TileOutOfRange(ValueError):
+    pass
+
+
+class Tile:
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, expires_at: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.expires_at = expires_at
+
+    def max_age(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+
+# ---- Tile geometry ----
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Web-mercator tile → (west, south, east, north) in degrees."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def _intersects(bounds, bbox) -> bool:
+    w, s, e, n = bounds
+    bw, bs, be, bn = bbox
+    return w < be and e > bw and s < bn and n > bs
+
+
+def sample_grid(z: int, x: int, y: int, size: int = TILE_GRID) -> List[Tuple[float, float]]:
+    """
+    Cell-centre (lat, lon) samples, row-major from the tile's north-west
+    corner, evenly spaced in mercator so they line up with the pixels.
+    """
+    n = 2 ** z
+    out = []
+    for row in range(size):
+        ty = y + (row + 0.5) / size
+        lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+        for col in range(size):
+            lon = (x + (col + 0.5) / size) / n * 360.0 - 180.0
+            out.append((lat, lon))
+    return out
+
+
+def hour_floor(epoch_s: float) -> int:
+    return int(epoch_s // 3600 * 3600)
+
+
+# ---- Rendering ----
+async def render_tile(z: int, x: int, y: int, hour: int) -> Tuple[bytes, bool]:
+    """JSON grid of HORI values (samples outside TILE_BBOX are null), and whether any is degraded."""
+    west, south, east, north = TILE_BBOX
+    samples = sample_grid(z, x, y)
+    inside = [i for i, (lat, lon) in enumerate(samples) if south <= lat <= north and west <= lon <= east]
+
+    values: List[Optional[int]] = [None] * len(samples)
+    degraded = False
+    if inside:
+        _, _, res, flags, _ = await score_points(
+            [samples[i][0] for i in inside],
+            [samples[i][1] for i in inside],
+            [hour] * len(inside),
+        )
+        for i, score in zip(inside, res.scores):
+            values[i] = score
+        degraded = any(flags)
+
+    doc = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "hour": time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime(hour)),
+        "bounds": [round(v, 6) for v in tile_bounds(z, x, y)],
+        "size": TILE_GRID,
+        "hori": values,
+        "degraded": degraded,
+    }
+    return json.dumps(doc, separators=(",", ":")).encode(), degraded
+
+
+# ---- Disk cache ----
+# Tiles live under <dir>/<refresh epoch>/<hour>/<z>/<x>/<y>.json; a new
+# forecast run gets a new directory and older ones are pruned.
+def _disk_path(cycle: int, key) -> Path:
+    z, x, y, hour = key
+    return Path(TILE_CACHE_DIR) / str(cycle) / str(hour) / str(z) / str(x) / f"{y}.json"
+
+
+def _disk_read(path: Path) -> Optional[bytes]:
+    try:
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def _disk_write(path: Path, body: bytes, cycle: int) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        tmp.replace(path)
+
+        # Drop directories of earlier forecast runs
+        for old in Path(TILE_CACHE_DIR).iterdir():
+            if old.name.isdigit() and int(old.name) < cycle:
+                shutil.rmtree(old, ignore_errors=True)
+    except OSError:
+        pass
+
+
+# ---- Public entry point ----
+async def get_tile(z: int, x: int, y: int, hour: Optional[int] = None) -> Tile:
+    """
+    Memory → disk → render. Only a render touches the forecast cache (and
+    possibly upstream); concurrent requests for one tile share it.
+    """
+    if not TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM:
+        raise TileOutOfRange(f"zoom must be within {TILE_MIN_ZOOM}..{TILE_MAX_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise TileOutOfRange("tile index out of range")
+    if not _intersects(tile_bounds(z, x, y), TILE_BBOX):
+        raise TileOutOfRange("tile outside coverage")
+
+    key = (z, x, y, hour_floor(time.time() if hour is None else hour))
+    tile = tile_cache.get(key)
+    if tile is not None:
+        return tile
+    return await tile_flight.do(key, lambda: _load_tile(key))
+
+
+async def _load_tile(key) -> Tile:
+    expires_at = next_refresh()
+    cycle = int(expires_at - FORECAST_CADENCE_S)
+    path = _disk_path(cycle, key) if TILE_CACHE_DIR else None
+
+    body = await asyncio.to_thread(_disk_read, path) if path else None
+    if body is None:
+        body, degraded = await render_tile(*key)
+        if degraded:
+            expires_at = min(expires_at, time.time() + TILE_DEGRADED_TTL_S)
+        elif path:
+            await asyncio.to_thread(_disk_write, path, body, cycle)
+
+    tile = Tile(body, expires_at)
+    tile_cache.set(key, tile, expires_at=expires_at)
+    return tile
@@ -0,0 +1,35 @@
+# app/trip_cache.py
+import hashlib
+import os
+
+from .utils.ttl_cache import TTLCache
+
+# Serialized /trips/{id} bodies; trips never change once written, so
+# entries only leave the cache to stay within the memory budget. Trips
+# scored from stale or fallback weather are neither cached here nor
+# marked immutable for clients.
+TRIP_CACHE_MAX_BYTES = int(os.getenv("TRIP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TRIP_CACHE_MAX_ENTRIES = int(os.getenv("TRIP_CACHE_MAX_ENTRIES", "20000"))
+TRIP_CACHE_MAX_AGE_S = int(os.getenv("TRIP_CACHE_MAX_AGE_S", str(24 * 3600)))
+
+trip_body_cache = TTLCache(max_entries=TRIP_CACHE_MAX_ENTRIES, max_bytes=TRIP_CACHE_MAX_BYTES)
+
+
+def trip_etag(body: bytes) -> str:
+    """Strong validator over the serialized body, so any format or storage change shows."""
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def trip_headers(body: bytes, degraded: bool = False) -> dict:
+    return {
+        "ETag": trip_etag(body),
+        "Cache-Control": "no-cache" if degraded else f"public, max-age={TRIP_CACHE_MAX_AGE_S}, immutable",
+    }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match may list several tags, or "*"."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
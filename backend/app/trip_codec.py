@@ -0,0 +1,221 @@
+# app/trip_codec.py
+import datetime as dt
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional
+
+import polyline
+
+from .models import HoriSegment
+from .scoring import REASONS, REASON_CODES
+
+# Packed arrays are stored little-endian regardless of host
+_SWAP = sys.byteorder != "little"
+
+
+def _pack(typecode: str, values) -> bytes:
+    arr = array(typecode, values)
+    if _SWAP:
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _unpack(typecode: str, raw: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(raw or b"")
+    if _SWAP:
+        arr.byteswap()
+    return arr
+
+
+def _epoch(ts: str) -> int:
+    d = dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=dt.timezone.utc)
+    return int(d.timestamp())
+
+
+def _iso(epoch: int) -> str:
+    d = dt.datetime.fromtimestamp(epoch, dt.timezone.utc)
+    return d.isoformat().replace("+00:00", "Z")
+
+
+@dataclass
+class SegmentColumns:
+    """
+    Scored route points as parallel lists, the form enrichment produces:
+    `eta` is epoch seconds and `reason` a code indexing REASONS.
+    HoriSegment models are only built for responses that need them.
+    """
+    lon: List[float]
+    lat: List[float]
+    eta: List[float]
+    temp_c: List[float]
+    aqi: List[int]
+    hori: List[int]
+    reason: List[int]
+    degraded: List[bool]
+    stale_age_s: List[Optional[int]]
+
+    def __len__(self) -> int:
+        return len(self.eta)
+
+    @classmethod
+    def from_segments(cls, segments) -> "SegmentColumns":
+        """From anything with lon/lat/ts/temp_c/aqi/hori/reason (models, rows)."""
+        return cls(
+            lon=[s.lon for s in segments],
+            lat=[s.lat for s in segments],
+            eta=[_epoch(s.ts) for s in segments],
+            temp_c=[s.temp_c for s in segments],
+            aqi=[s.aqi for s in segments],
+            hori=[s.hori for s in segments],
+            reason=[REASON_CODES[s.reason] for s in segments],
+            degraded=[getattr(s, "degraded", False) for s in segments],
+            stale_age_s=[getattr(s, "stale_age_s", None) for s in segments],
+        )
+
+    @classmethod
+    def concat(cls, parts: List["SegmentColumns"]) -> "SegmentColumns":
+        return cls(*([v for p in parts for v in getattr(p, name)] for name in cls.__dataclass_fields__))
+
+    def epochs(self) -> List[int]:
+        return [int(e) for e in self.eta]
+
+    def timestamps(self) -> List[str]:
+        return [_iso(e) for e in self.epochs()]
+
+    def models(self) -> List[HoriSegment]:
+        return [
+            HoriSegment(
+                lon=lon,
+                lat=lat,
+                ts=ts,
+                temp_c=temp,
+                aqi=aqi,
+                hori=score,
+                reason=REASONS[code],
+                degraded=bad,
+                stale_age_s=age,
+            )
+            for lon, lat, ts, temp, aqi, score, code, bad, age in zip(
+                self.lon, self.lat, self.timestamps(), self.temp_c, self.aqi,
+                self.hori, self.reason, self.degraded, self.stale_age_s,
+            )
+        ]
+
+
+def as_columns(segments) -> SegmentColumns:
+    """SegmentColumns as is, or a list of segment objects converted."""
+    if isinstance(segments, SegmentColumns):
+        return segments
+    return SegmentColumns.from_segments(segments)
+
+
+def _encode_flags(cols: SegmentColumns) -> dict:
+    # Rows saved before the flags were recorded stay unknown (NULL), not "fresh"
+    if any(bad is None for bad in cols.degraded):
+        return dict(seg_degraded=None, seg_stale_age=None)
+    return dict(
+        seg_degraded=bytes(1 if bad else 0 for bad in cols.degraded),
+        seg_stale_age=_pack("i", (-1 if age is None else age for age in cols.stale_age_s)),
+    )
+
+
+def encode_segments(segments) -> dict:
+    """
+    Pack segments (SegmentColumns, or anything with lon/lat/ts/temp_c/aqi/
+    hori/reason) into the compact `Trip` columns: polyline6 geometry plus
+    little-endian arrays of ts offsets (int32 s), temp (float32), aqi
+    (int16), hori (uint8), a reason-code byte string, degraded bytes and
+    stale ages (int32 s, -1 = not stale).
+    """
+    cols = as_columns(segments)
+    if not len(cols):
+        return dict(
+            geometry="", seg_count=0, seg_t0=0, seg_ts_offsets=b"",
+            seg_temp=b"", seg_aqi=b"", seg_hori=b"", seg_reason=b"",
+            seg_degraded=b"", seg_stale_age=b"",
+        )
+
+    epochs = cols.epochs()
+    t0 = epochs[0]
+
+    return dict(
+        geometry=polyline.encode(list(zip(cols.lat, cols.lon)), precision=6),
+        seg_count=len(cols),
+        seg_t0=t0,
+        seg_ts_offsets=_pack("i", (e - t0 for e in epochs)),
+        seg_temp=_pack("f", cols.temp_c),
+        seg_aqi=_pack("h", cols.aqi),
+        seg_hori=bytes(cols.hori),
+        seg_reason=bytes(cols.reason),
+        **_encode_flags(cols),
+    )
+
+
+def segment_columns(cols: SegmentColumns) -> dict:
+    """
+    Segments as parallel JSON-ready arrays (the `format=columnar` route
+    response): polyline6 geometry, second offsets from `t0`, and
+    temp/aqi/hori values plus reason codes indexing `reasons`, and the
+    degraded / stale_age_s flags.
+    """
+    epochs = cols.epochs()
+    t0 = epochs[0] if epochs else 0
+
+    return {
+        "geometry": polyline.encode(list(zip(cols.lat, cols.lon)), precision=6),
+        "t0": t0,
+        "eta_s": [e - t0 for e in epochs],
+        "temp_c": [round(t, 2) for t in cols.temp_c],
+        "aqi": cols.aqi,
+        "hori": cols.hori,
+        "reason": cols.reason,
+        "reasons": REASONS,
+        "degraded": cols.degraded,
+        "stale_age_s": cols.stale_age_s,
+    }
+
+
+def decode_segments(trip) -> List[dict]:
+    """Inverse of encode_segments, returning SegmentOut-shaped dicts."""
+    if not trip.seg_count:
+        return []
+
+    coords = polyline.decode(trip.geometry, precision=6)
+    offsets = _unpack("i", trip.seg_ts_offsets)
+    temps = _unpack("f", trip.seg_temp)
+    aqis = _unpack("h", trip.seg_aqi)
+    # Trips compacted before the flags were recorded have neither column
+    flagged = trip.seg_degraded is not None
+    ages = _unpack("i", trip.seg_stale_age) if flagged else None
+
+    return [
+        {
+            "id": None,
+            "idx": i,
+            "lon": lon,
+            "lat": lat,
+            "ts": _iso(trip.seg_t0 + offsets[i]),
+            "temp_c": round(temps[i], 2),
+            "aqi": aqis[i],
+            "hori": trip.seg_hori[i],
+            "reason": REASONS[trip.seg_reason[i]],
+            "degraded": bool(trip.seg_degraded[i]) if flagged else None,
+            "stale_age_s": (ages[i] if ages[i] >= 0 else None) if flagged else None,
+        }
+        for i, (lat, lon) in enumerate(coords[:trip.seg_count])
+    ]
+
+
+def is_compact(trip) -> bool:
+    return trip.seg_count is not None
+
+
+def trip_segments(trip) -> list:
+    """Segments of a trip, whichever storage format it was written in."""
+    if is_compact(trip):
+        return decode_segments(trip)
+    return trip.segments
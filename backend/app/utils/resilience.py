@@ -0,0 +1,127 @@
+# app/utils/resilience.py
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"circuit for {name} is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive failures; while
+    open every call fails immediately with CircuitOpenError. After
+    `reset_after_s` one probe call is let through (half-open): success
+    closes the circuit, failure opens it for another period.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_after_s: float,
+                 on_change: Optional[Callable[[str, str], None]] = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after_s = reset_after_s
+        self.on_change = on_change
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+        self.opens = 0
+        self.rejected = 0
+
+    def _set(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            if self.on_change:
+                self.on_change(self.name, state)
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_after_s:
+            self._set(self.HALF_OPEN)
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        self._set(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+            self._set(self.OPEN)
+
+    @asynccontextmanager
+    async def guard(self):
+        """Run one call under the breaker; a cancelled call counts as neither outcome."""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            yield
+        except asyncio.CancelledError:
+            self._probing = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+
+async def hedged(fn: Callable[[], Awaitable[Any]], hedge_after_s: float, attempts: int = 2,
+                 on_hedge: Optional[Callable[[], None]] = None) -> Any:
+    """
+    Await fn(); if it has not finished after `hedge_after_s`, start another
+    identical call (up to `attempts` in total) and return whichever succeeds
+    first. The others are cancelled. A failure is not retried by itself;
+    the error is raised once no attempt is left running.
+    """
+    pending = {asyncio.ensure_future(fn())}
+    started = 1
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            timeout = hedge_after_s if started < attempts else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                pending.add(asyncio.ensure_future(fn()))
+                started += 1
+                if on_hedge:
+                    on_hedge()
+                continue
+            for task in done:
+                if task.cancelled():
+                    error = error or asyncio.CancelledError()
+                elif task.exception() is None:
+                    return task.result()
+                else:
+                    error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
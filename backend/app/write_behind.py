@@ -0,0 +1,214 @@
+# app/write_behind.py
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from .database import AsyncSessionLocal, async_engine
+from .db_models import Trip, Segment, SearchedPoint
+
+log = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").strip().lower() in ("1", "true", "yes", "on")
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "1000"))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "100"))
+WRITE_BEHIND_INTERVAL_S = float(os.getenv("WRITE_BEHIND_INTERVAL_S", "0.5"))
+
+# A job whose insert fails is retried this many times in total, the n-th
+# retry WRITE_BEHIND_RETRY_S * n seconds later, before it is dropped
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "3"))
+WRITE_BEHIND_RETRY_S = float(os.getenv("WRITE_BEHIND_RETRY_S", "1.0"))
+
+# Parents before children so foreign keys hold within one flush
+_FLUSH_ORDER = (Trip, Segment, SearchedPoint)
+
+# One queued unit of work: rows for one or more tables, written together
+Job = List[Tuple[type, List[dict]]]
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-process queue of pending inserts, flushed by a background
+    task in multi-row batches when WRITE_BEHIND_BATCH jobs are waiting or
+    WRITE_BEHIND_INTERVAL_S has passed. `put` blocks while the queue is
+    full, so a slow database pushes back on request handlers.
+
+    If a batch insert fails its jobs are written one by one, so one bad
+    row only costs its own job; jobs that still fail are retried with
+    backoff up to WRITE_BEHIND_MAX_ATTEMPTS times.
+
+    Ids are reserved up front from Postgres sequences (see
+    persistence.allocate_ids), so other databases are refused: a
+    per-process id counter would collide across workers.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, interval_s: float):
+        self.batch_size = max(1, batch_size)
+        self.interval_s = interval_s
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        # (due monotonic time, attempts so far, job)
+        self._retry: List[Tuple[float, int, Job]] = []
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.retried = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def put(self, job: Job) -> None:
+        await self._queue.put(job)
+        self.enqueued += 1
+
+    def start(self) -> None:
+        if async_engine.dialect.name != "postgresql":
+            raise RuntimeError(
+                "WRITE_BEHIND needs PostgreSQL: ids are reserved from its sequences, "
+                f"and {async_engine.dialect.name} would hand out duplicate ids across workers"
+            )
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="write-behind")
+
+    async def stop(self) -> None:
+        """Stop the flush loop once everything queued so far is written."""
+        if self.running:
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Wake up for due retries even when no new jobs arrive
+            timeout = self.interval_s if self._retry else None
+            try:
+                job = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                job = None
+            if job is _STOP:
+                await self._drain_retries()
+                return
+
+            batch = [] if job is None else [(0, job)]
+            deadline = time.monotonic() + self.interval_s
+            stopping = False
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if job is _STOP:
+                    stopping = True
+                    break
+                batch.append((0, job))
+
+            await self._flush(self._due_retries() + batch)
+            if stopping:
+                await self._drain_retries()
+                return
+
+    def _due_retries(self) -> List[Tuple[int, Job]]:
+        now = time.monotonic()
+        due = [(attempts, job) for at, attempts, job in self._retry if at <= now]
+        self._retry = [entry for entry in self._retry if entry[0] > now]
+        return due
+
+    async def _drain_retries(self) -> None:
+        """On shutdown: keep retrying until every job is written or out of attempts."""
+        while self._retry:
+            wait = min(at for at, _, _ in self._retry) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self._flush(self._due_retries())
+
+    async def _insert(self, jobs: List[Job]) -> None:
+        """Write the rows of `jobs` in one transaction."""
+        rows_by_model = {model: [] for model in _FLUSH_ORDER}
+        for job in jobs:
+            for model, rows in job:
+                rows_by_model[model].extend(rows)
+
+        async with AsyncSessionLocal() as db:
+            for model in _FLUSH_ORDER:
+                for rows in _group_by_columns(rows_by_model[model]):
+                    await db.execute(insert(model), rows)
+            await db.commit()
+
+    def _job_failed(self, attempts: int, job: Job) -> None:
+        if attempts < WRITE_BEHIND_MAX_ATTEMPTS:
+            self._retry.append((time.monotonic() + WRITE_BEHIND_RETRY_S * attempts, attempts, job))
+            self.retried += 1
+            return
+        self.failed += 1
+        tables = ", ".join(f"{len(rows)} {model.__tablename__}" for model, rows in job)
+        log.error("write-behind job dropped after %d attempts (%s)", attempts, tables)
+
+    async def _flush(self, batch: List[Tuple[int, Job]]) -> None:
+        """`batch` holds (attempts so far, job) pairs."""
+        if not batch:
+            return
+
+        start = time.perf_counter()
+        try:
+            await self._insert([job for _, job in batch])
+        except Exception:
+            log.warning("write-behind flush of %d jobs failed; writing them one by one", len(batch), exc_info=True)
+            for attempts, job in batch:
+                try:
+                    await self._insert([job])
+                except Exception:
+                    self._job_failed(attempts + 1, job)
+                else:
+                    self.flushed += 1
+        else:
+            self.flushed += len(batch)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.last_flush_ms = round(elapsed_ms, 2)
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": WRITE_BEHIND,
+            "running": self.running,
+            "depth": self._queue.qsize(),
+            "max_depth": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "retrying": len(self._retry),
+            "retried": self.retried,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+def _group_by_columns(rows: List[dict]) -> List[List[dict]]:
+    """executemany needs identical keys per statement; split mixed row shapes."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    return list(groups.values())
+
+
+write_behind = WriteBehindQueue(
+    maxsize=WRITE_BEHIND_MAX_QUEUE,
+    batch_size=WRITE_BEHIND_BATCH,
+    interval_s=WRITE_BEHIND_INTERVAL_S,
+)
@@ -0,0 +1 @@
+# Benchmarks for the HORI backend (run from backend/: python -m bench.<name>)
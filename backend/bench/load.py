@@ -0,0 +1,324 @@
+# bench/load.py
+"""
+Load test /hori, /hori/route, /trips and /search against local upstream stubs.
+
+    cd backend
+    python -m bench.load --concurrency 16 --requests 400 --latency-ms 25
+    python -m bench.load --scenarios route --json --out results.json
+    DATABASE_URL=postgresql+psycopg2://... python -m bench.load
+
+Starts bench.stubs in a subprocess and drives the app in-process over
+ASGI (no sockets), so numbers reflect the app plus the injected upstream
+latency. With --target the requests go to a running server instead; it
+must already be configured with the printed *_URL variables. Defaults to
+a throwaway SQLite file when DATABASE_URL is not set.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+
+from bench.stubs import UPSTREAMS, add_latency_args
+
+SCENARIOS = ("hori", "route", "trips", "search")
+
+# Pennsylvania, where the production OSRM extract lives
+BBOX = (-80.52, 39.72, -74.69, 42.27)
+PLACES = (
+    "pittsburgh", "philadelphia", "harrisburg", "allentown", "erie", "scranton",
+    "lancaster", "state college", "reading", "bethlehem", "altoona", "york",
+)
+
+# (method, path, params or json body)
+Call = Tuple[str, str, Optional[dict], Optional[dict]]
+
+
+# ---- Request generators ----
+def _point_pool(rng: random.Random, n: int) -> List[Tuple[float, float]]:
+    w, s, e, nth = BBOX
+    return [(rng.uniform(w, e), rng.uniform(s, nth)) for _ in range(n)]
+
+
+def make_generators(rng: random.Random, distinct: int) -> dict:
+    """One callable per scenario; `distinct` bounds the key space so caches behave as in production."""
+    pool = _point_pool(rng, distinct)
+
+    def hori() -> Call:
+        lon, lat = rng.choice(pool)
+        return "GET", "/hori", {"lat": lat, "lon": lon}, None
+
+    def route() -> Call:
+        (slon, slat), (dlon, dlat) = rng.sample(pool, 2)
+        return "POST", "/hori/route", None, {"src": [slon, slat], "dst": [dlon, dlat]}
+
+    def trips() -> Call:
+        return "GET", "/trips", {"limit": 20}, None
+
+    def search() -> Call:
+        place = rng.choice(PLACES)
+        return "GET", "/search", {"q": place[:rng.randint(3, len(place))]}, None
+
+    return {"hori": hori, "route": route, "trips": trips, "search": search}
+
+
+# ---- Stubs ----
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stubs(args) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    cmd = [sys.executable, "-m", "bench.stubs", "--port", str(port),
+           "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)]
+    for name in UPSTREAMS:
+        override = getattr(args, f"{name}_latency_ms")
+        if override is not None:
+            cmd += [f"--{name.replace('_', '-')}-latency-ms", str(override)]
+
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/healthz", timeout=0.5).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("upstream stubs did not start")
+
+
+def point_app_at(url: str) -> None:
+    for name in UPSTREAMS:
+        os.environ[f"{name.upper()}_URL"] = url
+        os.environ[f"{name.upper()}_HTTP2"] = "false"
+
+
+# ---- Measurement ----
+def percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+async def _send(client: httpx.AsyncClient, call: Call) -> int:
+    method, path, params, body = call
+    r = await client.request(method, path, params=params, json=body)
+    await r.aread()
+    return r.status_code
+
+
+async def run_load(client, gen: Callable[[], Call], requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            call = gen()
+            start = time.perf_counter()
+            try:
+                status = await _send(client, call)
+            except httpx.HTTPError:
+                status = 599
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(lat) / len(lat), 2) if lat else 0.0,
+            "p50": round(percentile(lat, 0.50), 2),
+            "p95": round(percentile(lat, 0.95), 2),
+            "p99": round(percentile(lat, 0.99), 2),
+            "max": round(lat[-1], 2) if lat else 0.0,
+        },
+    }
+
+
+async def measure_allocations(client, gen: Callable[[], Call], samples: int) -> dict:
+    """
+    Sequential requests under tracemalloc (kept out of the timed run):
+    peak bytes allocated above the pre-request baseline, and bytes still
+    held afterwards (cache fills, leaks).
+    """
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            call = gen()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await _send(client, call)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+            retained.append(current - base)
+    finally:
+        tracemalloc.stop()
+
+    peaks.sort()
+    return {
+        "samples": samples,
+        "peak_kib_p50": round(percentile(peaks, 0.50) / 1024, 1),
+        "peak_kib_p95": round(percentile(peaks, 0.95) / 1024, 1),
+        "retained_bytes_mean": round(sum(retained) / len(retained)) if retained else 0,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ---- Entry point ----
+async def run_all(args, stub_url: Optional[str]) -> dict:
+    in_process = args.target is None
+    rng = random.Random(args.seed)
+    gens = make_generators(rng, args.distinct)
+
+    if in_process:
+        # Keep import-time prints off stdout so --json output stays parseable
+        with contextlib.redirect_stdout(sys.stderr):
+            from app.main import app
+            from app.database import engine
+
+        database = engine.url.get_backend_name()
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+    else:
+        database = "external"
+        lifespan = None
+        client = httpx.AsyncClient(base_url=args.target, timeout=60)
+
+    results = []
+    try:
+        # /trips needs rows to page through
+        if "trips" in args.scenarios and "route" not in args.scenarios:
+            await run_load(client, gens["route"], 20, 4)
+
+        for name in args.scenarios:
+            gen = gens[name]
+            if args.warmup:
+                await run_load(client, gen, args.warmup, args.concurrency)
+
+            res = {"scenario": name, **await run_load(client, gen, args.requests, args.concurrency)}
+            if in_process and args.alloc_samples:
+                res["alloc"] = await measure_allocations(client, gen, args.alloc_samples)
+            results.append(res)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database,
+            "mode": "asgi" if in_process else "http",
+            "stub_url": stub_url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "distinct": args.distinct,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "seed": args.seed,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS),
+                    help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    ap.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario first")
+    ap.add_argument("--distinct", type=int, default=50, help="size of the coordinate pool")
+    ap.add_argument("--alloc-samples", type=int, default=30, help="tracemalloc samples per scenario (0 = off)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--target", default=None, help="base URL of a running server instead of in-process ASGI")
+    ap.add_argument("--no-stubs", action="store_true", help="use the upstream *_URL env vars as they are")
+    ap.add_argument("--json", action="store_true", help="print machine-readable results only")
+    ap.add_argument("--out", default=None, help="also write the JSON results to this file")
+    add_latency_args(ap)
+    args = ap.parse_args()
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if not os.getenv("DATABASE_URL"):
+        tmp = os.path.join(tempfile.mkdtemp(prefix="hori-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}"
+
+    proc, stub_url = (None, None) if args.no_stubs else start_stubs(args)
+    try:
+        if stub_url:
+            point_app_at(stub_url)
+            if args.target and not args.json:
+                print("configure the target server with:")
+                for name in UPSTREAMS:
+                    print(f"  {name.upper()}_URL={stub_url}")
+        report = asyncio.run(run_all(args, stub_url))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    doc = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(doc + "\n")
+    if args.json:
+        print(doc)
+        return
+
+    m = report["meta"]
+    print(f"database: {m['database']}  mode: {m['mode']}  concurrency: {m['concurrency']}  "
+          f"upstream latency: {m['latency_ms']}±{m['jitter_ms']} ms")
+    print(f"{'scenario':>10} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'peak KiB':>9}")
+    for r in report["scenarios"]:
+        lat = r["latency_ms"]
+        peak = r.get("alloc", {}).get("peak_kib_p50", "-")
+        print(f"{r['scenario']:>10} {r['rps']:>9,.1f} {lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} "
+              f"{r['errors']:>5} {peak:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bench/segment_insert.py
+"""
+Trip + segment write throughput: per-row ORM adds vs app.persistence.save_trip.
+
+    cd backend
+    python -m bench.segment_insert --trips 200 --segments 200
+    DATABASE_URL=postgresql+psycopg2://... python -m bench.segment_insert
+
+Defaults to a throwaway SQLite file when DATABASE_URL is not set.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    _tmp = os.path.join(tempfile.mkdtemp(prefix="hori-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}"
+
+from app.database import AsyncSessionLocal, async_engine, engine  # noqa: E402
+from app.db_models import Base, Trip, Segment  # noqa: E402
+from app.models import HoriSegment  # noqa: E402
+from app.persistence import save_trip  # noqa: E402
+
+
+def _trip_values(i: int) -> dict:
+    return dict(
+        src_lon=-79.99, src_lat=40.44, dst_lon=-75.16, dst_lat=39.95,
+        distance_km=490.0, duration_min=290.0,
+        depart_iso="2024-01-01T08:00:00Z", arrive_iso="2024-01-01T12:50:00Z",
+        avg_hori=88.5, worst_hori=71, worst_idx=i % 200, max_aqi=95, avg_temp_c=12.5,
+        src_name="Pittsburgh", dst_name="Philadelphia", stop_names="[]",
+    )
+
+
+def _segments(n: int) -> list:
+    return [
+        HoriSegment(
+            lon=-79.99 + k * 0.02, lat=40.44 - k * 0.002,
+            ts=f"2024-01-01T08:{k % 60:02d}:00Z",
+            temp_c=12.0 + k % 7, aqi=40 + k % 50, hori=80 + k % 20,
+            reason="air_quality",
+        )
+        for k in range(n)
+    ]
+
+
+async def _orm_per_row(db, values: dict, segments: list) -> None:
+    """The pre-bulk path: commit the trip, then add segments one by one."""
+    trip = Trip(**values)
+    db.add(trip)
+    await db.commit()
+    await db.refresh(trip)
+
+    for idx, s in enumerate(segments):
+        db.add(Segment(
+            trip_id=trip.id, idx=idx, lon=s.lon, lat=s.lat, ts=s.ts,
+            temp_c=s.temp_c, aqi=s.aqi, hori=s.hori, reason=s.reason,
+        ))
+    await db.commit()
+
+
+async def _run(name: str, fn, trips: int, segments: list) -> dict:
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        for i in range(trips):
+            await fn(db, _trip_values(i), segments)
+        elapsed = time.perf_counter() - start
+
+    rows = trips * (len(segments) + 1)
+    return {
+        "method": name,
+        "trips": trips,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1),
+        "trips_per_sec": round(trips / elapsed, 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--trips", type=int, default=100)
+    ap.add_argument("--segments", type=int, default=200)
+    ap.add_argument("--json", action="store_true", help="print machine-readable results only")
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    segments = _segments(args.segments)
+
+    async def run_all():
+        try:
+            return [
+                await _run("orm_per_row", _orm_per_row, args.trips, segments),
+                await _run("bulk_save_trip", save_trip, args.trips, segments),
+            ]
+        finally:
+            await async_engine.dispose()
+
+    results = asyncio.run(run_all())
+    speedup = results[1]["rows_per_sec"] / results[0]["rows_per_sec"]
+
+    if args.json:
+        print(json.dumps({"database": engine.url.get_backend_name(), "results": results,
+                          "speedup": round(speedup, 2)}))
+        return
+
+    print(f"database: {engine.url.get_backend_name()}")
+    for r in results:
+        print(f"{r['method']:>16}: {r['rows_per_sec']:>10,.0f} rows/s  "
+              f"({r['trips_per_sec']:,.1f} trips/s, {r['seconds']}s)")
+    print(f"{'speedup':>16}: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# bench/stubs.py
+"""
+Local stand-ins for OSRM, Open-Meteo (forecast + air quality) and Nominatim.
+
+    cd backend
+    python -m bench.stubs --port 8900 --latency-ms 25 --jitter-ms 5
+
+Point the app at it with OSRM_URL / OPEN_METEO_URL / AIR_QUALITY_URL /
+NOMINATIM_URL=http://127.0.0.1:8900. bench.load starts it by itself.
+"""
+import argparse
+import asyncio
+import datetime as dt
+import math
+import random
+import zlib
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import polyline
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Vertex counts of the canned OSRM geometries; each route key maps to one
+ROUTE_SIZES = (200, 1000, 4000)
+FORECAST_DAYS = 7
+
+UPSTREAMS = ("osrm", "open_meteo", "air_quality", "nominatim")
+
+
+def _pick_size(key: str) -> int:
+    return ROUTE_SIZES[zlib.crc32(key.encode()) % len(ROUTE_SIZES)]
+
+
+@lru_cache(maxsize=1024)
+def _canned_route(coords: Tuple[Tuple[float, float], ...], variant: int) -> dict:
+    """
+    Deterministic OSRM-shaped route through `coords` ((lon, lat) pairs):
+    a gently wiggling line with one of ROUTE_SIZES vertices, polyline6
+    encoded, plus per-edge duration annotations.
+    """
+    n = _pick_size(f"{coords}:{variant}")
+    legs = max(1, len(coords) - 1)
+    per_leg = max(2, n // legs)
+
+    pts = []
+    for (lon0, lat0), (lon1, lat1) in zip(coords, coords[1:]):
+        for i in range(per_leg):
+            f = i / (per_leg - 1)
+            wiggle = 0.004 * math.sin(f * 40 + variant) * (1 + variant)
+            pts.append((lat0 + (lat1 - lat0) * f + wiggle, lon0 + (lon1 - lon0) * f))
+
+    lat0, lon0 = coords[0][1], coords[0][0]
+    lat1, lon1 = coords[-1][1], coords[-1][0]
+    km = 111.0 * math.hypot(lat1 - lat0, (lon1 - lon0) * math.cos(math.radians(lat0))) * (1.25 + 0.1 * variant)
+    duration_s = km / 65.0 * 3600
+
+    rng = random.Random(n + variant)
+    weights = [0.5 + rng.random() for _ in range(len(pts) - 1)]
+    total = sum(weights)
+
+    return {
+        "geometry": polyline.encode(pts, precision=6),
+        "distance": km * 1000,
+        "duration": duration_s,
+        "legs": [{"annotation": {"duration": [duration_s * w / total for w in weights]}}],
+    }
+
+
+@lru_cache(maxsize=4)
+def _hours(day: dt.date) -> Tuple[str, ...]:
+    start = dt.datetime.combine(day - dt.timedelta(days=1), dt.time(), dt.timezone.utc)
+    return tuple(
+        (start + dt.timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M")
+        for h in range(24 * (FORECAST_DAYS + 1))
+    )
+
+
+def _series(variable: str, lat: float, lon: float, n: int) -> list:
+    phase = (lat * 7 + lon * 3) % 6.28
+    if variable == "us_aqi":
+        return [int(35 + 40 * abs(math.sin(h / 9 + phase))) for h in range(n)]
+    return [round(12 + 14 * math.sin(h / 3.8 + phase), 1) for h in range(n)]
+
+
+def create_app(latency: Dict[str, Tuple[float, float]]) -> FastAPI:
+    """`latency` maps upstream name -> (mean ms, jitter ms)."""
+    app = FastAPI(title="HORI bench upstream stubs")
+    rng = random.Random()
+
+    async def delay(upstream: str) -> None:
+        mean, jitter = latency.get(upstream, (0.0, 0.0))
+        ms = rng.gauss(mean, jitter) if jitter else mean
+        if ms > 0:
+            await asyncio.sleep(ms / 1000)
+
+    @app.get("/healthz")
+    def healthz():
+        return {"ok": True}
+
+    @app.get("/route/v1/{profile}/{coords}")
+    async def osrm_route(profile: str, coords: str, alternatives: str = "false"):
+        await delay("osrm")
+        points = tuple(tuple(float(v) for v in c.split(",")) for c in coords.split(";"))
+        extra = int(alternatives) if alternatives.isdigit() else (1 if alternatives == "true" else 0)
+        routes = [_canned_route(points, v) for v in range(1 + min(extra, 2))]
+        return {"code": "Ok", "routes": routes}
+
+    def forecast(upstream: str):
+        async def handler(request: Request):
+            await delay(upstream)
+            q = request.query_params
+            lats = [float(v) for v in q["latitude"].split(",")]
+            lons = [float(v) for v in q["longitude"].split(",")]
+            variable = q["hourly"].split(",")[0]
+            times = list(_hours(dt.datetime.now(dt.timezone.utc).date()))
+
+            out = [
+                {"latitude": la, "longitude": lo, "hourly": {"time": times, variable: _series(variable, la, lo, len(times))}}
+                for la, lo in zip(lats, lons)
+            ]
+            return JSONResponse(out[0] if len(out) == 1 else out)
+        return handler
+
+    app.add_api_route("/v1/forecast", forecast("open_meteo"), methods=["GET"])
+    app.add_api_route("/v1/air-quality", forecast("air_quality"), methods=["GET"])
+
+    @app.get("/search")
+    async def nominatim(q: str, limit: int = 8):
+        await delay("nominatim")
+        h = zlib.crc32(q.encode())
+        return [
+            {
+                "display_name": f"{q.title()} {kind}, Pennsylvania, United States",
+                "lat": str(39.9 + (h % 2000) / 1000 + i * 0.01),
+                "lon": str(-80.2 + (h % 5000) / 1000 + i * 0.01),
+            }
+            for i, kind in enumerate(("Borough", "Township", "Station", "Park", "Road", "School", "Library", "Hall")[:limit])
+        ]
+
+    return app
+
+
+def add_latency_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="mean injected latency for every upstream")
+    ap.add_argument("--jitter-ms", type=float, default=5.0, help="std-dev of the injected latency")
+    for name in UPSTREAMS:
+        ap.add_argument(f"--{name.replace('_', '-')}-latency-ms", type=float, default=None,
+                        help=f"override the mean latency for {name}")
+
+
+def latency_from_args(args) -> Dict[str, Tuple[float, float]]:
+    out = {}
+    for name in UPSTREAMS:
+        override = getattr(args, f"{name}_latency_ms")
+        out[name] = (args.latency_ms if override is None else override, args.jitter_ms)
+    return out
+
+
+def main() -> None:
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    add_latency_args(ap)
+    args = ap.parse_args()
+
+    uvicorn.run(create_app(latency_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()